@@ -6,15 +6,89 @@ Windows ADK管理模块
 """
 
 import os
+import re
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
 import winreg
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional, Callable
 import logging
 from utils.logger import log_command
+from utils.encoding import safe_decode
 
 logger = logging.getLogger("WinPEManager")
 
+# DISM输出中的进度阶段关键词 -> 进度百分比
+_DISM_PROGRESS_STAGES = {
+    "正在初始化": 10,
+    "正在搜索": 20,
+    "正在处理": 50,
+    "正在应用": 70,
+    "正在清理": 90,
+    "完成": 100
+}
+# 一次匹配找出行中的阶段关键词，代替逐个关键词的子串查找
+_DISM_STAGE_RE = re.compile("|".join(map(re.escape, _DISM_PROGRESS_STAGES)))
+_DISM_PERCENT_RE = re.compile(r'(\d+)%')
+
+# SDKManifest.xml中的版本号属性，及首次读取的字节数
+_MANIFEST_VERSION_RE = re.compile(rb'Version="([^"]+)"')
+_MANIFEST_HEAD_SIZE = 4096
+
+# DISM连续无输出超过该秒数视为卡住；每次有新输出都会重新计时
+_DISM_IDLE_TIMEOUT = 60
+# 等待DISM进程结束时检查输出活动的间隔（秒）
+_DISM_POLL_INTERVAL = 0.5
+# 后台线程每次从管道读取的最大字节数
+_PIPE_READ_SIZE = 65536
+
+
+def _run_process_streaming(cmd: List[str], idle_timeout: float = _DISM_IDLE_TIMEOUT,
+                           **popen_kwargs) -> Tuple[int, bytes, bytes]:
+    """运行子进程，后台线程持续读取stdout/stderr，按输出活动计算超时
+
+    DISM执行期间不断输出进度，持续读取可避免管道写满导致进程阻塞；
+    只要仍有输出就不会超时，长时间无输出时终止进程并抛出TimeoutExpired
+
+    Returns:
+        Tuple[int, bytes, bytes]: (返回码, 标准输出, 错误输出)
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **popen_kwargs)
+    stdout_chunks: List[bytes] = []
+    stderr_chunks: List[bytes] = []
+    last_activity = [time.monotonic()]
+
+    def drain(stream, chunks):
+        for chunk in iter(lambda: stream.read1(_PIPE_READ_SIZE), b""):
+            chunks.append(chunk)
+            last_activity[0] = time.monotonic()
+        stream.close()
+
+    readers = [
+        threading.Thread(target=drain, args=(process.stdout, stdout_chunks), daemon=True),
+        threading.Thread(target=drain, args=(process.stderr, stderr_chunks), daemon=True)
+    ]
+    for reader in readers:
+        reader.start()
+
+    while True:
+        try:
+            process.wait(timeout=_DISM_POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            if time.monotonic() - last_activity[0] > idle_timeout:
+                process.kill()
+                process.wait()
+                raise subprocess.TimeoutExpired(cmd, idle_timeout)
+
+    for reader in readers:
+        reader.join()
+
+    return process.returncode, b"".join(stdout_chunks), b"".join(stderr_chunks)
+
 
 class ADKManager:
     """Windows ADK管理器类"""
@@ -39,6 +113,10 @@ class ADKManager:
         self.adk_version = None
         self.winpe_versions = {}
         self.command_callback = None  # 命令输出回调函数
+        # 已找到的DISM路径缓存，值为 (查找时的ADK路径, DISM路径)，ADK路径变化后自动失效
+        self._dism_path_cache: Optional[Tuple[Optional[Path], Path]] = None
+        # 已找到的部署工具目录缓存，值为 (查找时的ADK路径, 部署工具目录)
+        self._deploy_tools_cache: Optional[Tuple[Path, Path]] = None
 
     def set_command_callback(self, callback):
         """设置命令输出回调函数
@@ -157,14 +235,15 @@ class ADKManager:
             # 尝试从版本文件读取
             version_file = adk_path / "SDKManifest.xml"
             if version_file.exists():
-                with open(version_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # 简单的版本号提取
-                    if "Version" in content:
-                        import re
-                        version_match = re.search(r'Version="([^"]+)"', content)
-                        if version_match:
-                            return version_match.group(1)
+                with open(version_file, 'rb') as f:
+                    # Version属性通常位于文件开头的根元素中，先只读取开头部分，未找到再读取剩余内容
+                    content = f.read(_MANIFEST_HEAD_SIZE)
+                    version_match = _MANIFEST_VERSION_RE.search(content)
+                    if not version_match:
+                        content += f.read()
+                        version_match = _MANIFEST_VERSION_RE.search(content)
+                    if version_match:
+                        return version_match.group(1).decode('utf-8')
 
             # 从目录名推断版本
             if "11" in str(adk_path):
@@ -179,9 +258,8 @@ class ADKManager:
     def _get_winpe_version(self, winpe_path: Path) -> str:
         """获取WinPE版本信息"""
         try:
-            # 检查是否有winpe.wim文件
-            wim_files = list(winpe_path.glob("**/winpe.wim"))
-            if wim_files:
+            # 检查是否有winpe.wim文件，找到第一个即可，无需遍历完整个目录树
+            if next(winpe_path.glob("**/winpe.wim"), None) is not None:
                 return "已安装"
             else:
                 return "未完整安装"
@@ -205,12 +283,16 @@ class ADKManager:
         return architectures
 
     def get_deployment_tools_path(self) -> Optional[Path]:
-        """获取部署工具路径"""
+        """获取部署工具路径，DISM、Oscdimg等工具路径查找都依赖它，按ADK路径缓存探测结果"""
         if not self.adk_path:
             return None
 
+        if self._deploy_tools_cache and self._deploy_tools_cache[0] == self.adk_path:
+            return self._deploy_tools_cache[1]
+
         deploy_tools_path = self.adk_path / "Assessment and Deployment Kit" / "Deployment Tools"
         if deploy_tools_path.exists():
+            self._deploy_tools_cache = (self.adk_path, deploy_tools_path)
             return deploy_tools_path
         return None
 
@@ -259,7 +341,6 @@ class ADKManager:
                 return False
 
             # 检查DISM工具是否可以直接访问
-            import shutil
             system_dism = shutil.which("dism.exe")
             if system_dism:
                 # 比较路径是否一致
@@ -295,9 +376,6 @@ class ADKManager:
             return False, "找不到DandISetEnv.bat文件"
 
         try:
-            import tempfile
-            import subprocess
-
             # 创建临时批处理文件来捕获环境变量
             with tempfile.NamedTemporaryFile(mode='w', suffix='.bat', delete=False) as temp_bat:
                 temp_bat.write(f'@echo off\n')
@@ -318,15 +396,12 @@ class ADKManager:
 
                 # 读取环境变量
                 if os.path.exists(env_file_path):
+                    # 逐行读取并解析设置环境变量，每行只用一次partition拆分
                     with open(env_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        env_lines = f.readlines()
-
-                    # 解析并设置环境变量
-                    for line in env_lines:
-                        line = line.strip()
-                        if '=' in line:
-                            key, value = line.split('=', 1)
-                            os.environ[key] = value
+                        for line in f:
+                            key, sep, value = line.strip().partition('=')
+                            if sep:
+                                os.environ[key] = value
 
                     logger.info("ADK环境变量已加载")
 
@@ -361,7 +436,17 @@ class ADKManager:
             return False, error_msg
 
     def get_dism_path(self) -> Optional[Path]:
-        """获取DISM工具路径"""
+        """获取DISM工具路径，找到后按ADK路径缓存，避免每次执行DISM命令都重新探测文件系统"""
+        if self._dism_path_cache and self._dism_path_cache[0] == self.adk_path:
+            return self._dism_path_cache[1]
+
+        dism_path = self._find_dism_path()
+        if dism_path:
+            self._dism_path_cache = (self.adk_path, dism_path)
+        return dism_path
+
+    def _find_dism_path(self) -> Optional[Path]:
+        """在ADK部署工具目录和系统PATH中查找DISM工具"""
         deploy_tools_path = self.get_deployment_tools_path()
         if not deploy_tools_path:
             return None
@@ -377,7 +462,6 @@ class ADKManager:
                 return dism_path
 
         # 尝试系统环境变量
-        import shutil
         system_dism = shutil.which("dism.exe")
         if system_dism:
             return Path(system_dism)
@@ -402,7 +486,6 @@ class ADKManager:
                 return str(oscdimg_path)
 
         # 尝试系统PATH
-        import shutil
         system_oscdimg = shutil.which("oscdimg.exe")
         if system_oscdimg:
             return system_oscdimg
@@ -433,7 +516,6 @@ class ADKManager:
             # 重要：copype工具会自己创建目标目录，我们不能预先创建
             if working_dir.exists():
                 logger.warning(f"目标目录已存在，删除以供copype重新创建: {working_dir}")
-                import shutil
                 shutil.rmtree(working_dir, ignore_errors=True)
                 logger.debug("目录已删除，copype将创建完整的目录结构")
 
@@ -471,7 +553,6 @@ class ADKManager:
             success = result.returncode == 0
 
             # 处理输出
-            from utils.encoding import safe_decode
             stdout = safe_decode(result.stdout) if success else ""
             stderr = safe_decode(result.stderr)
 
@@ -557,18 +638,15 @@ class ADKManager:
             logger.info(f"开始执行DISM命令，参数: {formatted_args}")
 
             if capture_output:
-                # 使用超时机制和更详细的错误处理
-                result = subprocess.run(
+                # 边执行边读取输出，超时按无输出时长计算，避免慢速WIM操作被误判为超时
+                returncode, raw_stdout, raw_stderr = _run_process_streaming(
                     cmd,
-                    capture_output=True,
-                    text=False,
-                    timeout=60,  # 缩短超时时间到60秒，避免长时间阻塞
                     creationflags=subprocess.CREATE_NO_WINDOW
                 )
+                result = subprocess.CompletedProcess(cmd, returncode, raw_stdout, raw_stderr)
                 success = result.returncode == 0
 
                 # 使用编码工具处理输出
-                from utils.encoding import safe_decode
                 stdout = safe_decode(result.stdout) if result.stdout else ""
                 stderr = safe_decode(result.stderr) if result.stderr else ""
                 
@@ -627,7 +705,7 @@ class ADKManager:
             return success, stdout, stderr
 
         except subprocess.TimeoutExpired as e:
-            error_msg = f"DISM命令执行超时 (60秒): {str(e)}"
+            error_msg = f"DISM命令执行超时 ({e.timeout}秒无输出): {str(e)}"
             logger.error(error_msg)
             logger.error(f"超时的命令: {' '.join(cmd)}")
             return False, "", error_msg
@@ -637,12 +715,15 @@ class ADKManager:
             logger.error(f"错误详情: {repr(e)}")
             return False, "", error_msg
 
-    def run_dism_command_with_progress(self, args: List[str], progress_callback=None) -> Tuple[bool, str, str]:
+    def run_dism_command_with_progress(self, args: List[str], progress_callback=None,
+                                       line_callback=None) -> Tuple[bool, str, str]:
         """运行DISM命令，支持实时进度回调
 
         Args:
             args: DISM命令参数
             progress_callback: 进度回调函数 (percent: int, message: str)
+            line_callback: 逐行输出回调函数 (line: str)，DISM运行期间每读到一行即调用，
+                便于调用方边读边解析，无需等待完整输出后再拆分
 
         Returns:
             Tuple[bool, str, str]: (成功状态, 标准输出, 错误输出)
@@ -686,14 +767,10 @@ class ADKManager:
 
             total_lines = 0
             processed_lines = 0
-            progress_stages = {
-                "正在初始化": 10,
-                "正在搜索": 20,
-                "正在处理": 50,
-                "正在应用": 70,
-                "正在清理": 90,
-                "完成": 100
-            }
+            # 操作类型在整个命令执行期间不变，读取输出前确定一次即可
+            cmd_lower = ' '.join(cmd).lower()
+            is_mount = "/mount-wim" in cmd_lower
+            is_unmount = "/unmount-wim" in cmd_lower
 
             # 实时读取输出
             stdout_lines = []
@@ -708,6 +785,9 @@ class ADKManager:
                         stdout_lines.append(line)
                         total_lines += 1
 
+                        if line_callback:
+                            line_callback(line)
+
                         # 发送命令输出到回调和终端
                         if hasattr(self, '_emit_command_output'):
                             self._emit_command_output("DISM输出", line)
@@ -717,25 +797,24 @@ class ADKManager:
                         # 尝试解析进度信息
                         if progress_callback:
                             # 基于关键词判断进度阶段
-                            for keyword, progress in progress_stages.items():
-                                if keyword in line:
-                                    progress_callback(progress, f"正在执行: {keyword}")
-                                    break
+                            stage_match = _DISM_STAGE_RE.search(line)
+                            if stage_match:
+                                keyword = stage_match.group(0)
+                                progress_callback(_DISM_PROGRESS_STAGES[keyword], f"正在执行: {keyword}")
 
                             # 如果是数字百分比（某些DISM操作会输出）
-                            import re
-                            percentage_match = re.search(r'(\d+)%', line)
+                            percentage_match = _DISM_PERCENT_RE.search(line)
                             if percentage_match:
                                 percent = int(percentage_match.group(1))
                                 progress_callback(min(percent, 100), f"进度: {percent}%")
 
                             # 基于操作类型设置基础进度
-                            if "/mount-wim" in ' '.join(cmd).lower():
+                            if is_mount:
                                 base_progress = 20
                                 if processed_lines > 0:
                                     progress = min(base_progress + (processed_lines * 3), 95)
                                     progress_callback(progress, f"挂载进度: {progress}%")
-                            elif "/unmount-wim" in ' '.join(cmd).lower():
+                            elif is_unmount:
                                 base_progress = 20
                                 if processed_lines > 0:
                                     progress = min(base_progress + (processed_lines * 4), 95)
@@ -798,6 +877,7 @@ class ADKManager:
 
         dandisetenv_path = self.get_dandisetenv_path()
         has_dandisetenv = dandisetenv_path is not None
+        dism_path = self.get_dism_path()
 
         # 检查当前环境是否正确设置
         environment_ready = has_dandisetenv and self.check_current_environment()
@@ -810,7 +890,7 @@ class ADKManager:
             "adk_path": str(self.adk_path) if self.adk_path else "",
             "winpe_path": str(self.winpe_path) if self.winpe_path else "",
             "available_architectures": self.get_available_architectures(),
-            "dism_path": str(self.get_dism_path()) if self.get_dism_path() else "",
+            "dism_path": str(dism_path) if dism_path else "",
             "copype_path": str(self.get_copype_path()) if self.get_copype_path() else "",
             "dandisetenv_path": str(dandisetenv_path) if dandisetenv_path else "",
             "has_dandisetenv": has_dandisetenv,
@@ -850,7 +930,6 @@ class ADKManager:
                 logger.debug(f"MakeWinPEMedia不存在: {makewinpe_path}")
 
         # 尝试系统环境变量
-        import shutil
         system_makewinpe = shutil.which("MakeWinPEMedia.cmd")
         if system_makewinpe:
             logger.debug(f"从系统PATH找到MakeWinPEMedia: {system_makewinpe}")
@@ -897,7 +976,6 @@ class ADKManager:
                     return copype_path
 
             # 尝试系统环境变量
-            import shutil
             system_copype = shutil.which("copype.cmd")
             if system_copype:
                 logger.info(f"从系统PATH找到copype: {system_copype}")
@@ -1106,7 +1184,6 @@ class ADKManager:
 
             # 清理现有的WinPE目录
             if winpe_dir.exists():
-                import shutil
                 shutil.rmtree(winpe_dir)
                 self.logger.info(f"清理现有WinPE目录: {winpe_dir}")
 
@@ -1193,7 +1270,6 @@ class ADKManager:
 
                     # 最后尝试：直接搜索oscdimg.exe而不依赖ADK路径
                     self._emit_command_output("最后尝试", "直接搜索oscdimg.exe...")
-                    import shutil
                     system_oscdimg = shutil.which("oscdimg.exe")
                     if system_oscdimg:
                         self._emit_command_output("最后尝试", f"从系统PATH找到oscdimg.exe: {system_oscdimg}")
@@ -1251,7 +1327,6 @@ class ADKManager:
 
             if not oscdimg_path:
                 # 尝试系统PATH
-                import shutil
                 system_oscdimg = shutil.which("oscdimg.exe")
                 if system_oscdimg:
                     oscdimg_path = system_oscdimg
@@ -1326,7 +1401,6 @@ class ADKManager:
                 boot_files_status.append(f"etfsboot.com (本地) ({bootsect_file.stat().st_size} bytes)")
             elif 'etfsboot' in adk_boot_files:
                 # 复制ADK中的etfsboot.com到本地
-                import shutil
                 try:
                     shutil.copy2(adk_boot_files['etfsboot'], bootsect_file)
                     boot_files_status.append(f"etfsboot.com (从ADK复制) ({bootsect_file.stat().st_size} bytes)")
@@ -1341,7 +1415,6 @@ class ADKManager:
                 boot_files_status.append(f"efisys.bin (本地) ({efi_file.stat().st_size} bytes)")
             elif 'efisys' in adk_boot_files:
                 # 复制ADK中的efisys.bin到本地
-                import shutil
                 try:
                     shutil.copy2(adk_boot_files['efisys'], efi_file)
                     boot_files_status.append(f"efisys.bin (从ADK复制) ({efi_file.stat().st_size} bytes)")
@@ -1356,7 +1429,6 @@ class ADKManager:
                 boot_files_status.append(f"efisys_noesp.bin (本地) ({efi_noesp_file.stat().st_size} bytes)")
             elif 'efisys_noesp' in adk_boot_files:
                 # 复制ADK中的efisys_noesp.bin到本地
-                import shutil
                 try:
                     shutil.copy2(adk_boot_files['efisys_noesp'], efi_noesp_file)
                     boot_files_status.append(f"efisys_noesp.bin (从ADK复制) ({efi_noesp_file.stat().st_size} bytes)")
@@ -1513,7 +1585,6 @@ class ADKManager:
             success = result.returncode == 0
 
             # 处理输出
-            from utils.encoding import safe_decode
             stdout = safe_decode(result.stdout) if result.stdout else ""
             stderr = safe_decode(result.stderr) if result.stderr else ""
 
@@ -1602,7 +1673,6 @@ class ADKManager:
             success = result.returncode == 0
 
             # 处理输出
-            from utils.encoding import safe_decode
             stdout = safe_decode(result.stdout) if result.stdout else ""
             stderr = safe_decode(result.stderr) if result.stderr else ""
 
@@ -1661,7 +1731,6 @@ class ADKManager:
             # 检查是否为ISO创建命令，如果是，先尝试删除现有ISO文件
             if len(args) >= 3 and args[0].upper() == '/ISO':
                 iso_path = args[-1]  # 最后一个参数是ISO路径
-                import os
                 if os.path.exists(iso_path):
                     logger.info(f"检测到现有ISO文件，将先删除: {iso_path}")
                     self._emit_command_output("文件操作", f"删除现有ISO: {iso_path}")
@@ -1685,7 +1754,6 @@ class ADKManager:
                 success = result.returncode == 0
 
                 # 使用编码工具处理输出
-                from utils.encoding import safe_decode
                 stdout = safe_decode(result.stdout) if result.stdout else ""
                 stderr = safe_decode(result.stderr) if result.stderr else ""
 
@@ -12,6 +12,7 @@ import shutil
 from pathlib import Path
 from typing import Tuple, Optional, Callable
 from utils.logger import get_logger, log_command, log_build_step
+from utils.file_utils import get_directory_usage
 
 
 class CopypeManager:
@@ -263,11 +264,7 @@ class CopypeManager:
     def _count_files(self, directory: Path) -> int:
         """递归统计文件数量"""
         try:
-            count = 0
-            for item in directory.rglob("*"):
-                if item.is_file():
-                    count += 1
-            return count
+            return get_directory_usage(directory)[0]
         except Exception:
             return 0
 
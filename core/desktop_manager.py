@@ -6,7 +6,6 @@
 """
 
 import os
-import shutil
 import zipfile
 import requests
 from pathlib import Path
@@ -14,6 +13,8 @@ from typing import List, Dict, Any, Optional, Tuple
 import logging
 import tempfile
 
+from utils.file_utils import fast_copy2, walk_files
+
 logger = logging.getLogger("WinPEManager")
 
 
@@ -460,22 +461,11 @@ WinXShell是一个轻量级的WinPE桌面外壳程序，专为WinPE环境设计
         if self.cairo_dir.exists():
             info["installed"] = True
             
-            # 查找主程序
-            cairo_exe = None
-            for exe_file in self.cairo_dir.rglob("CairoDesktop.exe"):
-                cairo_exe = exe_file
-                break
+            # 一次遍历同时查找主程序并计算大小和文件数
+            total_size, file_count, cairo_exe = self._scan_directory(self.cairo_dir, "CairoDesktop.exe")
             
             if cairo_exe:
-                info["executable"] = str(cairo_exe)
-            
-            # 计算大小和文件数
-            total_size = 0
-            file_count = 0
-            for file_path in self.cairo_dir.rglob("*"):
-                if file_path.is_file():
-                    total_size += file_path.stat().st_size
-                    file_count += 1
+                info["executable"] = cairo_exe
             
             info["size"] = total_size
             info["size_mb"] = round(total_size / (1024 * 1024), 1)
@@ -507,12 +497,7 @@ WinXShell是一个轻量级的WinPE桌面外壳程序，专为WinPE环境设计
                 info["executable"] = str(winxshell_exe)
             
             # 计算大小和文件数
-            total_size = 0
-            file_count = 0
-            for file_path in self.winxshell_dir.rglob("*"):
-                if file_path.is_file():
-                    total_size += file_path.stat().st_size
-                    file_count += 1
+            total_size, file_count, _ = self._scan_directory(self.winxshell_dir)
             
             info["size"] = total_size
             info["size_mb"] = round(total_size / (1024 * 1024), 1)
@@ -523,6 +508,32 @@ WinXShell是一个轻量级的WinPE桌面外壳程序，专为WinPE环境设计
         
         return info
     
+    @staticmethod
+    def _scan_directory(directory: Path, find_name: Optional[str] = None) -> Tuple[int, int, Optional[str]]:
+        """遍历目录统计文件总大小和文件数，可同时查找指定文件名
+        
+        Args:
+            directory: 要遍历的目录
+            find_name: 需要查找的文件名
+            
+        Returns:
+            Tuple[int, int, Optional[str]]: (总大小, 文件数, 找到的文件路径)
+        """
+        total_size = 0
+        file_count = 0
+        found_path = None
+        # 与Windows下rglob一致，文件名比较不区分大小写
+        find_name_lower = find_name.lower() if find_name else None
+        for entry in walk_files(directory):
+            try:
+                total_size += entry.stat().st_size
+            except OSError:
+                continue
+            file_count += 1
+            if found_path is None and entry.name.lower() == find_name_lower:
+                found_path = entry.path
+        return total_size, file_count, found_path
+    
     def prepare_desktop_for_winpe(self, desktop_type: str, mount_dir: Path) -> Tuple[bool, str]:
         """为WinPE准备桌面环境
         
@@ -545,6 +556,25 @@ WinXShell是一个轻量级的WinPE桌面外壳程序，专为WinPE环境设计
             logger.error(error_msg)
             return False, error_msg
     
+    def _copy_tree_files(self, source_dir: Path, target_dir: Path) -> int:
+        """复制目录树中的所有文件，返回复制的文件数
+
+        os.walk按目录分别给出子目录和文件，无需逐项stat判断类型；
+        相对路径和目标目录每个目录只计算、创建一次，循环内使用字符串路径，不逐个文件构造Path
+        """
+        file_count = 0
+        source_root = os.fspath(source_dir)
+        target_base = os.fspath(target_dir)
+        # os.walk给出的子目录路径均以源目录开头，直接截取即得相对路径
+        prefix_len = len(os.path.join(source_root, ""))
+        for root, dirs, files in os.walk(source_root):
+            target_root = os.path.join(target_base, root[prefix_len:])
+            os.makedirs(target_root, exist_ok=True)
+            for name in files:
+                fast_copy2(os.path.join(root, name), os.path.join(target_root, name))
+                file_count += 1
+        return file_count
+
     def _prepare_cairo_for_winpe(self, mount_dir: Path) -> Tuple[bool, str]:
         """为WinPE准备Cairo Desktop"""
         try:
@@ -556,14 +586,7 @@ WinXShell是一个轻量级的WinPE桌面外壳程序，专为WinPE环境设计
             target_dir.mkdir(exist_ok=True)
             
             # 复制文件
-            file_count = 0
-            for item in self.cairo_dir.rglob("*"):
-                if item.is_file():
-                    relative_path = item.relative_to(self.cairo_dir)
-                    target_file = target_dir / relative_path
-                    target_file.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(item, target_file)
-                    file_count += 1
+            file_count = self._copy_tree_files(self.cairo_dir, target_dir)
             
             # 创建启动脚本
             startup_script = mount_dir / "Windows" / "System32" / "CairoShell.bat"
@@ -612,14 +635,7 @@ cmd.exe
             target_dir.mkdir(exist_ok=True)
             
             # 复制文件
-            file_count = 0
-            for item in self.winxshell_dir.rglob("*"):
-                if item.is_file():
-                    relative_path = item.relative_to(self.winxshell_dir)
-                    target_file = target_dir / relative_path
-                    target_file.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(item, target_file)
-                    file_count += 1
+            file_count = self._copy_tree_files(self.winxshell_dir, target_dir)
             
             # 创建优化的启动脚本
             startup_script = mount_dir / "Windows" / "System32" / "WinXShell.bat"
@@ -5,10 +5,10 @@
 提供统一的挂载、卸载、ISO创建、USB制作操作接口
 """
 
-import shutil
 from pathlib import Path
 from typing import Tuple
 
+from utils.file_utils import fast_copy2, COPY_FILE_NO_BUFFERING
 from utils.logger import (
     get_logger, 
     log_command, 
@@ -34,12 +34,13 @@ class OperationManager:
         self.parent_callback = parent_callback
         self.logger = get_logger("OperationManager")
     
-    def mount_wim(self, build_dir: Path, wim_file_path: Path = None) -> Tuple[bool, str]:
+    def mount_wim(self, build_dir: Path, wim_file_path: Path = None, verify: bool = False) -> Tuple[bool, str]:
         """统一挂载接口
         
         Args:
             build_dir: 构建目录路径
             wim_file_path: WIM文件路径（可选，如果不提供则自动查找）
+            verify: 是否在挂载前校验WIM完整性（/checkintegrity，会完整读取一遍WIM）
             
         Returns:
             Tuple[bool, str]: (挂载结果, 消息)
@@ -78,8 +79,12 @@ class OperationManager:
                 "/mount-wim",
                 "/wimfile:" + wim_file_str,
                 "/index:1",
-                "/mountdir:" + mount_dir_str
+                "/mountdir:" + mount_dir_str,
+                # 延迟目录元数据回写，加快挂载
+                "/optimize"
             ]
+            if verify:
+                args.append("/checkintegrity")
             
             # 记录命令
             log_command(" ".join(args), "挂载WIM镜像")
@@ -417,7 +422,7 @@ class OperationManager:
                 log_build_step("复制WIM文件", f"目标: {usb_path}")
                 
                 dest_wim_path = usb_path / wim_file_path.name
-                shutil.copy2(wim_file_path, dest_wim_path)
+                fast_copy2(wim_file_path, dest_wim_path, COPY_FILE_NO_BUFFERING)
                 
                 # 设置启动扇区（简化实现）
                 self.logger.info("设置USB启动扇区...")
@@ -5,11 +5,15 @@
 提供统一的路径管理和WIM文件查找功能
 """
 
+import os
 from pathlib import Path
 from typing import List, Dict, Optional
 
 from utils.logger import get_logger, log_build_step
 
+# 构建目录中查找WIM文件的最大目录深度（media/sources/boot.wim位于第3层）
+_WIM_SEARCH_MAX_DEPTH = 3
+
 
 class PathManager:
     """路径管理器
@@ -59,20 +63,23 @@ class PathManager:
                 ("dism", build_dir / "winpe.wim"),
             ]
             
+            # 构建目录只递归扫描一次，结果同时用于查找其他WIM和每个WIM的挂载状态判断
+            build_wims = self._scan_wim_files(build_dir)
+
             # 搜索特定模式的WIM文件
             for wim_type, wim_path in search_patterns:
                 if wim_path.exists():
-                    wim_info = self._create_wim_info(wim_path, wim_type, build_dir)
+                    wim_info = self._create_wim_info(wim_path, wim_type, build_dir, build_wims)
                     wim_files.append(wim_info)
                     self.logger.info(f"找到{wim_type}模式WIM文件: {wim_path}")
             
             # 递归搜索其他WIM文件
-            for wim_path in build_dir.rglob("*.wim"):
+            processed_paths = {wf["path"] for wf in wim_files}
+            for wim_path in build_wims:
                 # 跳过已经处理过的文件
-                already_processed = any(wf["path"] == wim_path for wf in wim_files)
-                if not already_processed:
+                if wim_path not in processed_paths:
                     wim_type = self._determine_wim_type(wim_path)
-                    wim_info = self._create_wim_info(wim_path, wim_type, build_dir)
+                    wim_info = self._create_wim_info(wim_path, wim_type, build_dir, build_wims)
                     wim_files.append(wim_info)
                     self.logger.info(f"找到其他WIM文件: {wim_path}")
             
@@ -111,7 +118,7 @@ class PathManager:
                 return wim_path
         
         # 如果优先级文件都不存在，查找第一个可用的WIM文件
-        wim_files = list(build_dir.rglob("*.wim"))
+        wim_files = self._scan_wim_files(build_dir)
         if wim_files:
             wim_path = wim_files[0]
             self.logger.info(f"使用第一个找到的WIM文件: {wim_path}")
@@ -120,7 +127,34 @@ class PathManager:
         self.logger.warning("未找到任何WIM文件")
         return None
     
-    def _create_wim_info(self, wim_path: Path, wim_type: str, build_dir: Path) -> Dict:
+    @staticmethod
+    def _scan_wim_files(build_dir: Path, max_depth: int = _WIM_SEARCH_MAX_DEPTH) -> List[Path]:
+        """在构建目录中按限定深度查找WIM文件
+
+        WIM文件只会出现在构建目录的浅层位置，限定深度后不再遍历挂载目录中的整个镜像文件树；
+        返回顺序与rglob一致（先当前目录再逐个子目录），"第一个WIM文件"的选择不受影响
+        """
+        wim_files = []
+        pending = [(os.fspath(build_dir), 1)]
+        while pending:
+            current, depth = pending.pop()
+            subdirs = []
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            if os.path.normcase(entry.name).endswith(".wim"):
+                                wim_files.append(Path(entry.path))
+                        elif depth < max_depth and entry.is_dir(follow_symlinks=False):
+                            subdirs.append((entry.path, depth + 1))
+            except OSError:
+                continue
+            # 子目录逆序入栈，出栈时按列目录顺序依次处理
+            pending.extend(reversed(subdirs))
+        return wim_files
+
+    def _create_wim_info(self, wim_path: Path, wim_type: str, build_dir: Path,
+                         build_wims: Optional[List[Path]] = None) -> Dict:
         """创建WIM文件信息字典"""
         try:
             return {
@@ -128,7 +162,7 @@ class PathManager:
                 "name": wim_path.name,
                 "type": wim_type,
                 "size": wim_path.stat().st_size,
-                "mount_status": self._check_mount_status_for_wim(wim_path, build_dir),
+                "mount_status": self._check_mount_status_for_wim(wim_path, build_dir, build_wims),
                 "build_dir": build_dir
             }
         except Exception as e:
@@ -157,8 +191,12 @@ class PathManager:
         except Exception:
             return "unknown"
     
-    def _check_mount_status_for_wim(self, wim_path: Path, build_dir: Path) -> bool:
-        """检查特定WIM文件的挂载状态"""
+    def _check_mount_status_for_wim(self, wim_path: Path, build_dir: Path,
+                                    build_wims: Optional[List[Path]] = None) -> bool:
+        """检查特定WIM文件的挂载状态
+
+        build_wims为调用方已扫描到的构建目录WIM列表，未提供时才重新扫描
+        """
         try:
             mount_dir = self.get_mount_dir(build_dir)
             if not mount_dir.exists():
@@ -189,7 +227,7 @@ class PathManager:
             
             # 如果没有挂载信息文件，检查是否只有一个WIM文件被挂载
             # 这种情况下，假设挂载目录中的内容属于当前WIM文件
-            wim_files_in_build = list(build_dir.rglob("*.wim"))
+            wim_files_in_build = build_wims if build_wims is not None else self._scan_wim_files(build_dir)
             if len(wim_files_in_build) == 1:
                 # 检查唯一的WIM文件是否是当前文件
                 only_wim = wim_files_in_build[0]
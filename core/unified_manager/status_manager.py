@@ -8,6 +8,7 @@
 from pathlib import Path
 from typing import Dict
 
+from utils.file_utils import get_directory_usage
 from utils.logger import get_logger, log_error
 
 
@@ -74,7 +75,7 @@ class StatusManager:
             info = {
                 "build_dir": str(build_dir),
                 "build_dir_exists": build_dir.exists(),
-                "build_dir_size": sum(f.stat().st_size for f in build_dir.rglob("*") if f.is_file()) if build_dir.exists() else 0,
+                "build_dir_size": get_directory_usage(build_dir)[1],
                 "wim_files": wim_files,
                 "mount_status": mount_status,
                 "has_boot_wim": any(wf["name"].lower() == "boot.wim" for wf in wim_files),
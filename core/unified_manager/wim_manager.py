@@ -88,9 +88,9 @@ class UnifiedWIMManager:
         return self.check_manager.pre_usb_checks(build_dir, usb_path)
     
     # === 操作接口 ===
-    def mount_wim(self, build_dir: Path, wim_file_path: Path = None) -> Tuple[bool, str]:
+    def mount_wim(self, build_dir: Path, wim_file_path: Path = None, verify: bool = False) -> Tuple[bool, str]:
         """统一挂载接口"""
-        return self.operation_manager.mount_wim(build_dir, wim_file_path)
+        return self.operation_manager.mount_wim(build_dir, wim_file_path, verify)
     
     def unmount_wim(self, build_dir: Path, commit: bool = True) -> Tuple[bool, str]:
         """统一卸载接口"""
@@ -6,11 +6,38 @@
 """
 
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any
-from datetime import datetime
 
 from utils.logger import get_logger
+from utils.file_utils import walk_files, stat_size
+
+# 系统自带文件（小写），不作为自定义工具处理
+_SYSTEM_FILES = frozenset({
+    "cmd.exe", "powershell.exe", "reg.exe", "sfc.exe", "chkdsk.exe",
+    "format.com", "diskpart.exe", "bcdedit.exe", "bootsect.exe",
+    "wpeinit.exe", "wpeutil.exe", "winpeshl.exe", "winload.exe"
+})
+
+# WinXShell程序目录中按扩展名归类的结果字段
+_WINXSHELL_SUFFIX_BUCKETS = {".exe": "executable_paths", ".lua": "lua_scripts"}
+
+# System32中视为第三方工具的扩展名
+_TOOL_SUFFIXES = frozenset({".exe", ".msi", ".bat", ".cmd", ".ps1"})
+
+# System32中视为启动配置的扩展名
+_CONFIG_SUFFIXES = frozenset({".ini", ".cfg", ".conf", ".xml", ".json"})
+
+# System32中的常见启动脚本（小写，按检查顺序排列）
+_STARTUP_SCRIPT_NAMES = ("winpeshl.ini", "startnet.cmd", "launch.cmd", "autorun.cmd")
+
+# PEConfig中视为启动脚本的扩展名
+_SCRIPT_SUFFIXES = frozenset({".cmd", ".bat", ".ps1"})
+
+# Drivers目录中视为驱动文件的扩展名
+_DRIVER_SUFFIXES = frozenset({".inf", ".sys", ".dll"})
 
 
 class ComponentAnalyzer:
@@ -19,6 +46,9 @@ class ComponentAnalyzer:
     def __init__(self):
         self.logger = get_logger("ComponentAnalyzer")
 
+        # 单次分析内的目录列表缓存，键为目录路径，同一目录只读取一次
+        self._dir_cache: Dict[str, List[Tuple[str, os.DirEntry]]] = {}
+
     def analyze_wim_differences(self, source_mount: Path, target_mount: Path) -> Dict[str, Any]:
         """
         分析源和目标WIM的组件差异
@@ -31,49 +61,52 @@ class ComponentAnalyzer:
             差异分析结果
         """
         self.logger.info("开始分析源和目标WIM的组件差异...")
+        self._dir_cache.clear()
 
         analysis = {
-            "analysis_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "analysis_time": time.strftime("%Y-%m-%d %H:%M:%S"),
             "source_info": self._analyze_wim_structure(source_mount, "源WIM"),
             "target_info": self._analyze_wim_structure(target_mount, "目标WIM"),
             "differences": {},
             "migration_plan": {}
         }
 
-        # 分析核心文件差异
-        analysis["differences"]["core_files"] = self._compare_core_files(
-            source_mount, target_mount
-        )
-
-        # 分析外部程序差异
-        analysis["differences"]["external_programs"] = self._compare_external_programs(
-            source_mount, target_mount
-        )
-
-        # 分析启动脚本差异
-        analysis["differences"]["startup_scripts"] = self._compare_startup_scripts(
-            source_mount, target_mount
-        )
-
-        # 分析驱动程序差异
-        analysis["differences"]["drivers"] = self._compare_drivers(
-            source_mount, target_mount
-        )
+        # 各项差异比较只读取两个挂载目录且互不依赖，并发执行以叠加文件系统I/O等待
+        comparisons = {
+            "core_files": self._compare_core_files,                # 核心文件差异
+            "external_programs": self._compare_external_programs,  # 外部程序差异
+            "startup_scripts": self._compare_startup_scripts,      # 启动脚本差异
+            "drivers": self._compare_drivers                       # 驱动程序差异
+        }
+        with ThreadPoolExecutor(max_workers=len(comparisons)) as executor:
+            futures = {
+                key: executor.submit(compare, source_mount, target_mount)
+                for key, compare in comparisons.items()
+            }
+            for key, future in futures.items():
+                analysis["differences"][key] = future.result()
 
         # 生成迁移计划
         analysis["migration_plan"] = self._generate_migration_plan(analysis["differences"])
 
+        self._dir_cache.clear()
         self.logger.info("WIM组件差异分析完成")
         return analysis
 
     def _analyze_wim_structure(self, mount_path: Path, label: str) -> Dict[str, Any]:
         """分析WIM基本结构"""
+        # 逐级检查，上级目录不存在时无需再探测下级路径
+        windows_dir = mount_path / "Windows"
+        windows_exists = windows_dir.exists()
+        system32_exists = windows_exists and (windows_dir / "System32").exists()
+        boot_exists = system32_exists and (windows_dir / "System32" / "winpe.wim").exists()
+
         structure = {
             "label": label,
             "path": str(mount_path),
-            "windows_exists": (mount_path / "Windows").exists(),
-            "system32_exists": (mount_path / "Windows" / "System32").exists(),
-            "boot_exists": (mount_path / "Windows" / "System32" / "winpe.wim").exists(),
+            "windows_exists": windows_exists,
+            "system32_exists": system32_exists,
+            "boot_exists": boot_exists,
             "custom_components": self._find_custom_components(mount_path)
         }
 
@@ -91,24 +124,25 @@ class ComponentAnalyzer:
 
         differences = {}
         for file_name in core_files:
-            source_file = source_system32 / file_name
-            target_file = target_system32 / file_name
+            # 每个文件只stat一次，存在性和大小都从同一次结果中得到
+            source_size = stat_size(source_system32 / file_name)
+            target_size = stat_size(target_system32 / file_name)
+            source_exists = source_size is not None
+            target_exists = target_size is not None
 
             differences[file_name] = {
-                "source_exists": source_file.exists(),
-                "target_exists": target_file.exists(),
-                "source_size": source_file.stat().st_size if source_file.exists() else 0,
-                "target_size": target_file.stat().st_size if target_file.exists() else 0,
+                "source_exists": source_exists,
+                "target_exists": target_exists,
+                "source_size": source_size or 0,
+                "target_size": target_size or 0,
                 "needs_replacement": False
             }
 
             # 如果目标存在且版本不同，需要替换
-            if target_file.exists() and source_file.exists():
-                source_size = source_file.stat().st_size
-                target_size = target_file.stat().st_size
+            if target_exists and source_exists:
                 if source_size != target_size:
                     differences[file_name]["needs_replacement"] = True
-            elif target_file.exists():
+            elif target_exists:
                 differences[file_name]["needs_replacement"] = True
 
         return differences
@@ -136,6 +170,7 @@ class ComponentAnalyzer:
 
     def _check_winxshell(self, mount_path: Path) -> Dict[str, Any]:
         """检查WinXShell"""
+        prefix_len = self._relative_prefix_len(mount_path)
         system32 = mount_path / "Windows" / "System32"
         program_files = mount_path / "Program Files"
 
@@ -146,31 +181,27 @@ class ComponentAnalyzer:
             "lua_scripts": []
         }
 
-        # 检查System32中的WinXShell文件
-        for pattern in ["WinXShell*", "*.jcfg", "*.lua"]:
-            for file_path in system32.glob(pattern):
-                if file_path.is_file():
-                    if file_path.suffix.lower() == ".exe":
-                        winxshell_info["executable_paths"].append(str(file_path.relative_to(mount_path)))
-                    elif file_path.suffix.lower() in [".jcfg", ".lua"]:
-                        winxshell_info["config_files"].append(str(file_path.relative_to(mount_path)))
+        # 检查System32中的WinXShell文件（WinXShell*, *.jcfg, *.lua），一次列目录完成匹配
+        for name, entry in self._list_dir_files(system32):
+            if name.endswith(".exe") and name.startswith("winxshell"):
+                winxshell_info["executable_paths"].append(entry.path[prefix_len:])
+            elif name.endswith((".jcfg", ".lua")):
+                winxshell_info["config_files"].append(entry.path[prefix_len:])
 
         # 检查Program Files中的WinXShell
         winxshell_dir = program_files / "WinXShell"
         if winxshell_dir.exists():
             winxshell_info["installed"] = True
-            for file_path in winxshell_dir.rglob("*"):
-                if file_path.is_file():
-                    rel_path = file_path.relative_to(mount_path)
-                    if file_path.suffix.lower() == ".exe":
-                        winxshell_info["executable_paths"].append(str(rel_path))
-                    elif file_path.suffix.lower() == ".lua":
-                        winxshell_info["lua_scripts"].append(str(rel_path))
+            for entry in walk_files(winxshell_dir):
+                bucket = _WINXSHELL_SUFFIX_BUCKETS.get(os.path.splitext(entry.name)[1].lower())
+                if bucket:
+                    winxshell_info[bucket].append(entry.path[prefix_len:])
 
         return winxshell_info
 
     def _check_cairo_shell(self, mount_path: Path) -> Dict[str, Any]:
         """检查Cairo Shell"""
+        prefix_len = self._relative_prefix_len(mount_path)
         system32 = mount_path / "Windows" / "System32"
 
         cairo_info = {
@@ -179,62 +210,71 @@ class ComponentAnalyzer:
             "config_files": []
         }
 
-        # 检查Cairo相关文件
-        cairo_patterns = ["Cairo*", "*.cairo", "CairoShell.exe"]
-        for pattern in cairo_patterns:
-            for file_path in system32.glob(pattern):
-                if file_path.is_file():
-                    if file_path.suffix.lower() == ".exe":
-                        cairo_info["installed"] = True
-                        cairo_info["executable_paths"].append(str(file_path.relative_to(mount_path)))
-                    else:
-                        cairo_info["config_files"].append(str(file_path.relative_to(mount_path)))
+        # 检查Cairo相关文件（Cairo*, *.cairo），一次列目录完成匹配
+        for name, entry in self._list_dir_files(system32):
+            if not (name.startswith("cairo") or name.endswith(".cairo")):
+                continue
+            if name.endswith(".exe"):
+                cairo_info["installed"] = True
+                cairo_info["executable_paths"].append(entry.path[prefix_len:])
+            else:
+                cairo_info["config_files"].append(entry.path[prefix_len:])
 
         return cairo_info
 
     def _find_custom_tools(self, mount_path: Path) -> List[str]:
         """查找自定义工具"""
+        prefix_len = self._relative_prefix_len(mount_path)
         tools = []
         system32 = mount_path / "Windows" / "System32"
 
-        # 查找常见的第三方工具
-        tool_patterns = [
-            "*.exe", "*.msi", "*.bat", "*.cmd", "*.ps1"
-        ]
-
-        for pattern in tool_patterns:
-            for file_path in system32.glob(pattern):
-                if file_path.is_file():
-                    # 排除系统文件
-                    if not self._is_system_file(file_path.name):
-                        tools.append(str(file_path.relative_to(mount_path)))
+        # 查找常见的第三方工具，复用已缓存的System32文件列表，按扩展名一次匹配
+        for name, entry in self._list_dir_files(system32):
+            if os.path.splitext(name)[1] in _TOOL_SUFFIXES:
+                # 排除系统文件
+                if not self._is_system_file(name):
+                    tools.append(entry.path[prefix_len:])
 
         return tools
 
     def _find_startup_configs(self, mount_path: Path) -> List[str]:
         """查找启动配置文件"""
+        prefix_len = self._relative_prefix_len(mount_path)
         configs = []
         system32 = mount_path / "Windows" / "System32"
 
-        config_patterns = [
-            "*.ini", "*.cfg", "*.conf", "*.xml", "*.json"
-        ]
-
-        for pattern in config_patterns:
-            for file_path in system32.glob(pattern):
-                if file_path.is_file():
-                    configs.append(str(file_path.relative_to(mount_path)))
+        for name, entry in self._list_dir_files(system32):
+            if os.path.splitext(name)[1] in _CONFIG_SUFFIXES:
+                configs.append(entry.path[prefix_len:])
 
         return configs
 
+    def _list_dir_files(self, directory: Path) -> List[Tuple[str, os.DirEntry]]:
+        """列出目录下的文件条目 (小写文件名, 目录项)，目录不存在时返回空列表
+
+        结果在单次分析内缓存，System32等目录被多个检测步骤共用时只读取一次，
+        文件名也只转换一次小写
+        """
+        key = os.fspath(directory)
+        files = self._dir_cache.get(key)
+        if files is None:
+            try:
+                with os.scandir(key) as entries:
+                    files = [(entry.name.lower(), entry) for entry in entries if entry.is_file()]
+            except OSError:
+                files = []
+            # 并发比较时可能有多个线程同时读取同一目录，结果相同，后写入的覆盖即可
+            self._dir_cache[key] = files
+        return files
+
+    @staticmethod
+    def _relative_prefix_len(mount_path: Path) -> int:
+        """计算挂载路径前缀长度，用字符串切片代替 Path.relative_to 得到相对路径"""
+        return len(str(mount_path / "_")) - 1
+
     def _is_system_file(self, filename: str) -> bool:
         """判断是否为系统文件"""
-        system_files = {
-            "cmd.exe", "powershell.exe", "reg.exe", "sfc.exe", "chkdsk.exe",
-            "format.com", "diskpart.exe", "bcdedit.exe", "bootsect.exe",
-            "wpeinit.exe", "wpeutil.exe", "winpeshl.exe", "winload.exe"
-        }
-        return filename.lower() in system_files
+        return filename.lower() in _SYSTEM_FILES
 
     def _find_program_differences(self, source_programs: Dict, target_programs: Dict) -> Dict[str, Any]:
         """查找程序差异"""
@@ -265,34 +305,36 @@ class ComponentAnalyzer:
         source_scripts = self._find_startup_scripts(source_mount)
         target_scripts = self._find_startup_scripts(target_mount)
 
+        # 目标脚本转为集合查找，缺失列表只计算一次并保持源脚本顺序
+        target_set = set(target_scripts)
+        missing_in_target = [s for s in source_scripts if s not in target_set]
+
         return {
             "source_scripts": source_scripts,
             "target_scripts": target_scripts,
-            "missing_in_target": [s for s in source_scripts if s not in target_scripts],
-            "needs_migration": len([s for s in source_scripts if s not in target_scripts]) > 0
+            "missing_in_target": missing_in_target,
+            "needs_migration": len(missing_in_target) > 0
         }
 
     def _find_startup_scripts(self, mount_path: Path) -> List[str]:
         """查找启动脚本"""
+        prefix_len = self._relative_prefix_len(mount_path)
         scripts = []
         system32 = mount_path / "Windows" / "System32"
 
-        # 检查常见的启动脚本
-        script_files = [
-            "winpeshl.ini", "startnet.cmd", "launch.cmd", "autorun.cmd"
-        ]
-
-        for script_file in script_files:
-            script_path = system32 / script_file
-            if script_path.exists():
-                scripts.append(str(script_path.relative_to(mount_path)))
+        # 检查常见的启动脚本，直接在已缓存的System32文件列表中按名称查找
+        system32_str = os.fspath(system32)
+        system32_names = {name for name, _ in self._list_dir_files(system32)}
+        for script_file in _STARTUP_SCRIPT_NAMES:
+            if script_file in system32_names:
+                scripts.append(os.path.join(system32_str, script_file)[prefix_len:])
 
         # 检查PEConfig目录
         peconfig_dir = system32 / "PEConfig"
         if peconfig_dir.exists():
-            for file_path in peconfig_dir.rglob("*"):
-                if file_path.is_file() and file_path.suffix.lower() in [".cmd", ".bat", ".ps1"]:
-                    scripts.append(str(file_path.relative_to(mount_path)))
+            for entry in walk_files(peconfig_dir):
+                if os.path.splitext(entry.name)[1].lower() in _SCRIPT_SUFFIXES:
+                    scripts.append(entry.path[prefix_len:])
 
         return scripts
 
@@ -311,24 +353,25 @@ class ComponentAnalyzer:
 
     def _find_drivers(self, mount_path: Path) -> List[str]:
         """查找驱动程序"""
+        prefix_len = self._relative_prefix_len(mount_path)
         drivers = []
 
-        # 检查Drivers目录
-        drivers_dir = mount_path / "Drivers"
-        if drivers_dir.exists():
-            for file_path in drivers_dir.rglob("*"):
-                if file_path.is_file() and file_path.suffix.lower() in [".inf", ".sys", ".dll"]:
-                    drivers.append(str(file_path.relative_to(mount_path)))
+        # 检查Drivers目录，目录不存在时遍历直接为空，无需先单独探测
+        for entry in walk_files(mount_path / "Drivers"):
+            if os.path.splitext(entry.name)[1].lower() in _DRIVER_SUFFIXES:
+                drivers.append(entry.path[prefix_len:])
 
         return drivers
 
     def _find_custom_components(self, mount_path: Path) -> Dict[str, Any]:
         """查找自定义组件"""
+        mount_str = os.fspath(mount_path)
+        system32_str = os.path.join(mount_str, "Windows", "System32")
         components = {
-            "peconfig_exists": (mount_path / "Windows" / "System32" / "PEConfig").exists(),
-            "programs_dir_exists": (mount_path / "Windows" / "System32" / "Programs").exists(),
-            "drivers_dir_exists": (mount_path / "Drivers").exists(),
-            "scripts_dir_exists": (mount_path / "Scripts").exists()
+            "peconfig_exists": os.path.isdir(os.path.join(system32_str, "PEConfig")),
+            "programs_dir_exists": os.path.isdir(os.path.join(system32_str, "Programs")),
+            "drivers_dir_exists": os.path.isdir(os.path.join(mount_str, "Drivers")),
+            "scripts_dir_exists": os.path.isdir(os.path.join(mount_str, "Scripts"))
         }
 
         return components
@@ -9,6 +9,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+from utils.file_utils import get_directory_usage
+
 
 @dataclass
 class VersionReplaceConfig:
@@ -182,11 +184,7 @@ def validate_paths_for_replacement(
         try:
             import shutil
 
-            source_size = 0
-            if config.source_dir.exists():
-                for item in config.source_dir.rglob("*"):
-                    if item.is_file():
-                        source_size += item.stat().st_size
+            source_size = get_directory_usage(config.source_dir)[1]
 
             target_size = 0
             if config.target_wim.exists():
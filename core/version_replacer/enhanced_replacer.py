@@ -7,15 +7,109 @@
 """
 
 import os
+import re
 import shutil
 import json
+import hashlib
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any, Set
+from typing import Dict, List, Tuple, Optional, Any, Set, Union
 from datetime import datetime
 import tempfile
 
 from utils.logger import get_logger, log_command, log_build_step, log_system_event
+from utils.file_utils import (
+    fast_copy2, file_needs_copy, copy_tree_parallel, walk_files, stat_size, COPY_FILE_NO_BUFFERING
+)
+
+# DISM /Format:Table 输出中的数据行（跳过表头和分隔线），一次匹配取出名称和状态两列；
+# 前导空白之后紧跟的字符不能再是空白，保证表头/分隔线判断不会因回溯空白而失效
+_FEATURE_ROW_RE = re.compile(
+    r'^[ \t]*(?![ \t]|Feature Name|-)([^|\r\n]*?)[ \t]*\|[ \t]*([^|\r\n]*?)[ \t]*(?:\||\r?$)',
+    re.MULTILINE
+)
+
+# DISM "键 : 值" 格式的输出行，一次匹配取出去除空白后的键和值
+_KEY_VALUE_RE = re.compile(r'^\s*([^:]+?)\s*:\s*(.*?)\s*$')
+
+# /Get-WimInfo 输出中的字段 -> 镜像信息键名
+_WIM_INFO_FIELDS = {"Name": "name", "Description": "description", "Size": "size"}
+
+# 挂载目录差异分析中需要检查的外部程序目录
+_EXTERNAL_PROGRAM_DIRS = (
+    "Program Files/WinXShell",
+    "Program Files/CairoShell",
+    "Program Files/Explorer",
+    "Windows/System32/Programs"
+)
+
+# 挂载目录差异分析中需要比较内容的启动配置文件
+_STARTUP_CONFIG_FILES = (
+    "Windows/System32/winpeshl.ini",
+    "Windows/System32/PEConfig/Run.cmd",
+    "Windows/System32/PEConfig/LoadPETools.cmd",
+    "Windows/System32/StartNet.cmd"
+)
+
+# 深度比较文件结构时遍历的关键目录
+_DEEP_COMPARE_DIRS = (
+    "Windows/System32/PEConfig",
+    "Windows/System32/Drivers",
+    "Program Files"
+)
+
+# 视为桌面配置的文件扩展名
+_DESKTOP_CONFIG_SUFFIXES = frozenset({".jcfg", ".lua", ".xml", ".theme"})
+
+# 桌面配置分析时跳过的系统目录（小写，统一使用/分隔）
+_DESKTOP_CONFIG_SKIP_PATHS = (
+    "windows/system32/catroot",
+    "windows/system32/wbem",
+    "windows/winsxs"
+)
+# 合并为单个正则，直接匹配原始路径（\和/均可作为分隔符），无需逐个路径先转换大小写和分隔符
+_DESKTOP_CONFIG_SKIP_RE = re.compile(
+    "|".join(re.escape(skip).replace("/", r"[\\/]") for skip in _DESKTOP_CONFIG_SKIP_PATHS),
+    re.IGNORECASE | re.ASCII
+)
+
+# setupreg.cmd中安装环境下的错误路径，一次扫描同时匹配带\Windows和不带\Windows两种写法
+_SETUP_TARGET_PATH_RE = re.compile(rb'X:\\\$windows\.~bt(\\Windows)?')
+
+# 计算文件摘要时每次读取的字节数
+_DIGEST_CHUNK_SIZE = 64 * 1024
+
+# SOFTWARE注册表配置单元和WinSxS清单目录相对挂载目录的路径分段
+_SOFTWARE_HIVE_PARTS = ("Windows", "System32", "Config", "SOFTWARE")
+_WINSXS_MANIFESTS_PARTS = ("Windows", "WinSxS", "Manifests")
+
+# 并行计算文件摘要的最大线程数
+_DIGEST_WORKERS = min(8, os.cpu_count() or 1)
+
+# 组件类型 -> (DISM操作, 目标参数前缀, 附加参数, 操作描述)
+_DISM_COMPONENT_COMMANDS = {
+    "package": ("/Add-Package", "/PackagePath:", (), "添加包"),
+    "driver": ("/Add-Driver", "/Driver:", ("/ForceUnsigned",), "添加驱动"),
+    "feature": ("/Enable-Feature", "/FeatureName:", ("/All",), "启用功能"),
+}
+
+
+# 系统自带的DISM位置，按优先级排列
+_SYSTEM_DISM_PATHS = (
+    r"C:\Windows\System32\dism.exe",
+    r"C:\Windows\SysWOW64\dism.exe"
+)
+
+
+@lru_cache(maxsize=1)
+def _resolve_system_dism_path() -> Optional[str]:
+    """查找系统DISM，结果在进程内缓存，每次创建替换器时无需重复探测"""
+    for dism_path in _SYSTEM_DISM_PATHS:
+        if os.path.exists(dism_path):
+            return dism_path
+    return None
 
 
 class EnhancedVersionReplacer:
@@ -42,6 +136,13 @@ class EnhancedVersionReplacer:
         # DISM路径
         self.dism_path = self._get_dism_path()
 
+        # 单次替换流程内的DISM查询结果缓存，键为 (命令类型, 挂载目录)
+        self._dism_result_cache: Dict[Tuple[str, str], Any] = {}
+
+        # 配置文件内容摘要缓存，键为文件路径，值为 (文件标识, 摘要)
+        # 文件标识为 (设备号, inode, 纳秒修改时间, 大小)，文件被替换或修改后即失效
+        self._digest_cache: Dict[str, Tuple[Tuple[int, int, int, int], bytes]] = {}
+
     def _get_dism_path(self) -> str:
         """获取DISM工具路径"""
         # 优先使用自定义DISM路径
@@ -50,15 +151,12 @@ class EnhancedVersionReplacer:
             return str(Path(custom_dism))
 
         # 使用系统DISM
-        dism_paths = [
-            r"C:\Windows\System32\dism.exe",
-            r"C:\Windows\SysWOW64\dism.exe"
-        ]
-
-        for dism_path in dism_paths:
-            if Path(dism_path).exists():
-                return dism_path
+        dism_path = _resolve_system_dism_path()
+        if dism_path:
+            return dism_path
 
+        # 未找到的结果不缓存，安装DISM后可重新查找
+        _resolve_system_dism_path.cache_clear()
         raise FileNotFoundError("找不到DISM工具，请确保已安装Windows ADK或DISM工具可用")
 
     def set_progress_callback(self, callback):
@@ -90,13 +188,15 @@ class EnhancedVersionReplacer:
             self.progress_callback(percent, message)
         log_build_step(f"增强版版本替换 {percent}%", message)
 
-    def run_dism_command(self, command: List[str], description: str = "") -> Tuple[bool, str]:
+    def run_dism_command(self, command: List[str], description: str = "",
+                         line_callback=None) -> Tuple[bool, str]:
         """
         运行DISM命令（带进度支持）
 
         Args:
             command: DISM命令参数列表
             description: 命令描述
+            line_callback: 逐行输出回调函数，用于边执行边解析DISM输出
 
         Returns:
             Tuple[bool, str]: (成功状态, 输出信息)
@@ -112,7 +212,9 @@ class EnhancedVersionReplacer:
                 print(f"{progress_msg} [增强版本替换]")
 
             # 使用ADK管理器的带进度方法
-            success, stdout, stderr = self.adk.run_dism_command_with_progress(command, progress_callback)
+            success, stdout, stderr = self.adk.run_dism_command_with_progress(
+                command, progress_callback, line_callback=line_callback
+            )
 
             if success:
                 success_msg = f"DISM命令成功: {description}"
@@ -155,30 +257,32 @@ class EnhancedVersionReplacer:
             "drivers": []
         }
 
-        # 获取WIM信息
+        # 获取WIM信息，在DISM输出过程中逐行解析镜像信息
+        images = []
+        current_image = {}
+
+        def parse_line(line: str):
+            nonlocal current_image
+            match = _KEY_VALUE_RE.match(line)
+            if not match:
+                return
+            key, value = match.groups()
+            if key == "Index":
+                if current_image:
+                    images.append(current_image)
+                current_image = {"index": value}
+            elif current_image and key in _WIM_INFO_FIELDS:
+                current_image[_WIM_INFO_FIELDS[key]] = value
+
         command = ["/Get-WimInfo", f"/WimFile:{wim_path}"]
-        success, output = self.run_dism_command(command, f"获取WIM信息 - {description}")
+        success, output = self.run_dism_command(
+            command, f"获取WIM信息 - {description}", line_callback=parse_line
+        )
 
         if success:
-            # 解析输出获取镜像信息
-            lines = output.split('\n')
-            current_image = {}
-
-            for line in lines:
-                line = line.strip()
-                if "Index :" in line:
-                    if current_image:
-                        analysis["images"].append(current_image)
-                    current_image = {"index": line.split(":")[-1].strip()}
-                elif "Name :" in line and current_image:
-                    current_image["name"] = line.split(":")[-1].strip()
-                elif "Description :" in line and current_image:
-                    current_image["description"] = line.split(":")[-1].strip()
-                elif "Size :" in line and current_image:
-                    current_image["size"] = line.split(":")[-1].strip()
-
             if current_image:
-                analysis["images"].append(current_image)
+                images.append(current_image)
+            analysis["images"] = images
 
         return analysis
 
@@ -257,7 +361,8 @@ class EnhancedVersionReplacer:
             mount_dir_obj.mkdir(parents=True, exist_ok=True)
 
             # 使用统一管理器挂载
-            success, message = self.wim_manager.mount_wim(mount_dir_obj.parent, wim_path_obj)
+            # WIM由本流程刚刚生成，无需再做完整性校验
+            success, message = self.wim_manager.mount_wim(mount_dir_obj.parent, wim_path_obj, verify=False)
 
             if success:
                 self._log(f"WIM挂载成功: {mount_dir}", "success")
@@ -317,10 +422,11 @@ class EnhancedVersionReplacer:
                 self._log(f"挂载目录不存在: {mount_dir}", "error")
                 return False
 
-            # 使用DISM设置正确的目标路径
-            dism_path = self._get_dism_path()
+            # 使用DISM设置正确的目标路径，路径在初始化时已探测
+            dism_path = self.dism_path
 
-            # 方法1：设置目标路径为X:\ (标准的WinPE路径)
+            # 设置目标路径为X:\ (标准的WinPE路径)；SYSTEMROOT随目标路径确定为X:\Windows，
+            # DISM没有单独设置SYSTEMROOT的选项，只需一次DISM调用
             self._log("使用DISM设置WinPE目标路径...", "info")
             cmd = [
                 str(dism_path),
@@ -335,22 +441,7 @@ class EnhancedVersionReplacer:
             else:
                 self._log(f"DISM设置目标路径失败: {output}", "warning")
 
-            # 方法2：额外设置确保SYSTEMROOT正确
-            self._log("确保WinPE SYSTEMROOT路径正确...", "info")
-            cmd_systemroot = [
-                str(dism_path),
-                "/Image:" + str(mount_path),
-                "/Set-Sysroot:X:\\Windows"
-            ]
-
-            success_systemroot, output_systemroot = self.run_dism_command(cmd_systemroot, "设置WinPE SYSTEMROOT")
-
-            if success_systemroot:
-                self._log("✅ DISM设置SYSTEMROOT成功", "success")
-            else:
-                self._log(f"DISM设置SYSTEMROOT失败: {output_systemroot}", "warning")
-
-            # 方法3：创建和修复配置文件
+            # 创建和修复配置文件
             self._fix_winpe_config_files(mount_path)
 
             self._log("WinPE启动路径修复完成", "success")
@@ -383,16 +474,17 @@ class EnhancedVersionReplacer:
             if setupreg_cmd.exists():
                 self._log("检查并修复setupreg.cmd中的路径配置...", "info")
                 try:
-                    with open(setupreg_cmd, 'r', encoding='utf-8') as f:
-                        content = f.read()
+                    with open(setupreg_cmd, 'rb') as f:
+                        original_content = f.read()
 
-                    # 替换可能存在的错误路径
-                    original_content = content
-                    content = content.replace('X:\\$windows.~bt\\Windows', 'X:\\Windows')
-                    content = content.replace('X:\\$windows.~bt', 'X:\\')
+                    # 替换可能存在的错误路径，路径均为ASCII，直接按字节一次替换，无需解码
+                    content = _SETUP_TARGET_PATH_RE.sub(
+                        lambda m: b'X:\\Windows' if m.group(1) else b'X:\\', original_content
+                    )
 
+                    # 内容未变化时不重写文件
                     if content != original_content:
-                        with open(setupreg_cmd, 'w', encoding='utf-8') as f:
+                        with open(setupreg_cmd, 'wb') as f:
                             f.write(content)
                         self._log("✅ setupreg.cmd路径配置修复成功", "success")
                     else:
@@ -419,6 +511,9 @@ class EnhancedVersionReplacer:
         """
         self._log(f"使用DISM添加{component_type}到WIM: {component_path}", "info")
 
+        # 镜像内容即将变化，之前缓存的DISM查询结果不再可靠
+        self._dism_result_cache.clear()
+
         # 确保WIM已挂载
         if not Path(mount_dir).exists():
             success = self.mount_wim_with_dism(wim_path, mount_dir)
@@ -433,44 +528,19 @@ class EnhancedVersionReplacer:
                 target_path = Path(mount_dir) / Path(component_path).name
                 if Path(component_path).is_file():
                     target_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(component_path, target_path)
+                    fast_copy2(component_path, target_path)
                     self._log(f"文件添加成功: {component_name}", "success")
                     return True
                 elif Path(component_path).is_dir():
-                    shutil.copytree(component_path, target_path, dirs_exist_ok=True)
+                    shutil.copytree(component_path, target_path, dirs_exist_ok=True, copy_function=fast_copy2)
                     self._log(f"目录添加成功: {component_name}", "success")
                     return True
 
-            elif component_type == "package":
-                # 使用DISM添加包
-                command = [
-                    "/Add-Package",
-                    f"/Image:{mount_dir}",
-                    f"/PackagePath:{component_path}"
-                ]
-                success, output = self.run_dism_command(command, f"添加包 - {component_name}")
-                return success
-
-            elif component_type == "driver":
-                # 使用DISM添加驱动
-                command = [
-                    "/Add-Driver",
-                    f"/Image:{mount_dir}",
-                    f"/Driver:{component_path}",
-                    "/ForceUnsigned"
-                ]
-                success, output = self.run_dism_command(command, f"添加驱动 - {component_name}")
-                return success
-
-            elif component_type == "feature":
-                # 使用DISM启用功能
-                command = [
-                    "/Enable-Feature",
-                    f"/Image:{mount_dir}",
-                    f"/FeatureName:{component_path}",
-                    "/All"
-                ]
-                success, output = self.run_dism_command(command, f"启用功能 - {component_name}")
+            elif component_type in _DISM_COMPONENT_COMMANDS:
+                # 使用DISM添加包/驱动或启用功能
+                action, target_option, extra_args, action_desc = _DISM_COMPONENT_COMMANDS[component_type]
+                command = [action, f"/Image:{mount_dir}", f"{target_option}{component_path}", *extra_args]
+                success, output = self.run_dism_command(command, f"{action_desc} - {component_name}")
                 return success
 
             else:
@@ -517,25 +587,22 @@ class EnhancedVersionReplacer:
             self._log(f"目标挂载目录不存在: {target_mount}", "error")
             return differences
 
-        # 分析外部程序
-        self._update_progress(55, "分析外部程序差异...")
-        external_programs = self._analyze_external_programs(source_path, target_path)
-        differences["external_programs"] = external_programs
-
-        # 分析启动配置
-        self._update_progress(60, "分析启动配置差异...")
-        startup_configs = self._analyze_startup_configs(source_path, target_path)
-        differences["startup_configs"] = startup_configs
-
-        # 分析桌面配置
-        self._update_progress(65, "分析桌面配置差异...")
-        desktop_configs = self._analyze_desktop_configs(source_path, target_path)
-        differences["desktop_configs"] = desktop_configs
-
-        # 深度比较文件结构
-        self._update_progress(70, "深度比较文件结构...")
-        file_differences = self._deep_compare_files(source_path, target_path)
-        differences.update(file_differences)
+        # 各项分析只读取两个挂载目录且互不依赖，并发执行以叠加文件系统I/O等待；
+        # 进度按原顺序在当前线程中汇报
+        subtasks = [
+            (55, "分析外部程序差异...", "external_programs", self._analyze_external_programs),
+            (60, "分析启动配置差异...", "startup_configs", self._analyze_startup_configs),
+            (65, "分析桌面配置差异...", "desktop_configs", self._analyze_desktop_configs),
+            (70, "深度比较文件结构...", None, self._deep_compare_files),
+        ]
+        with ThreadPoolExecutor(max_workers=len(subtasks)) as executor:
+            futures = [executor.submit(func, source_path, target_path) for _, _, _, func in subtasks]
+            for (percent, message, key, _), future in zip(subtasks, futures):
+                self._update_progress(percent, message)
+                if key:
+                    differences[key] = future.result()
+                else:
+                    differences.update(future.result())
 
         self._update_progress(75, "挂载目录差异分析完成")
         return differences
@@ -545,14 +612,7 @@ class EnhancedVersionReplacer:
         external_programs = []
 
         # 查找外部程序目录
-        program_dirs = [
-            "Program Files/WinXShell",
-            "Program Files/CairoShell",
-            "Program Files/Explorer",
-            "Windows/System32/Programs"
-        ]
-
-        for program_dir in program_dirs:
+        for program_dir in _EXTERNAL_PROGRAM_DIRS:
             source_program = source_path / program_dir
             target_program = target_path / program_dir
 
@@ -565,58 +625,85 @@ class EnhancedVersionReplacer:
                     "files": []
                 }
 
-                # 获取所有文件
+                # 获取所有文件，源文件大小直接取自目录项缓存的stat信息
                 if source_program.is_dir():
-                    for file_path in source_program.rglob("*"):
-                        if file_path.is_file():
-                            relative_path = file_path.relative_to(source_program)
-                            target_file = target_program / relative_path
-
-                            file_info = {
-                                "relative_path": str(relative_path),
-                                "source_file": str(file_path),
-                                "target_file": str(target_file),
-                                "exists_in_target": target_file.exists(),
-                                "size_match": target_file.exists() and file_path.stat().st_size == target_file.stat().st_size
-                            }
-                            program_info["files"].append(file_info)
+                    prefix_len = len(os.path.join(str(source_program), ""))
+                    for entry in walk_files(source_program):
+                        relative_path = entry.path[prefix_len:]
+                        target_file = target_program / relative_path
+                        # 一次stat同时得到目标文件是否存在及其大小
+                        target_size = stat_size(target_file)
+
+                        file_info = {
+                            "relative_path": relative_path,
+                            "source_file": entry.path,
+                            "target_file": str(target_file),
+                            "exists_in_target": target_size is not None,
+                            "size_match": target_size is not None and entry.stat().st_size == target_size
+                        }
+                        program_info["files"].append(file_info)
 
                 external_programs.append(program_info)
 
         return external_programs
 
+    def _files_content_match(self, source_file: Union[str, Path], target_file: Union[str, Path]) -> bool:
+        """判断两个文件内容是否一致，大小不同时无需读取内容即可判定不一致"""
+        try:
+            source_stat = os.stat(source_file)
+            target_stat = os.stat(target_file)
+            if source_stat.st_size != target_stat.st_size:
+                return False
+            return (self._content_digest(source_file, source_stat) ==
+                    self._content_digest(target_file, target_stat))
+        except Exception:
+            return False
+
+    def _content_digest(self, file_path: Union[str, Path], file_stat: Optional[os.stat_result] = None) -> bytes:
+        """获取文件内容摘要，文件标识未变化时直接返回缓存结果
+
+        只保留摘要而不保留原始内容，比较结果只需要判断内容是否一致；
+        直接对原始字节计算摘要，无需先按UTF-8解码再编码
+        """
+        if file_stat is None:
+            file_stat = os.stat(file_path)
+        key = str(file_path)
+        identity = (file_stat.st_dev, file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size)
+        cached = self._digest_cache.get(key)
+        if cached and cached[0] == identity:
+            return cached[1]
+
+        # 分块读取计算摘要，大文件也无需整体读入内存
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_DIGEST_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        digest = hasher.digest()
+        self._digest_cache[key] = (identity, digest)
+        return digest
+
     def _analyze_startup_configs(self, source_path: Path, target_path: Path) -> List[Dict]:
         """分析启动配置差异"""
         startup_configs = []
+        pending_matches = []
 
         # 查找启动配置文件
-        config_files = [
-            "Windows/System32/winpeshl.ini",
-            "Windows/System32/PEConfig/Run.cmd",
-            "Windows/System32/PEConfig/LoadPETools.cmd",
-            "Windows/System32/StartNet.cmd"
-        ]
-
-        for config_file in config_files:
+        for config_file in _STARTUP_CONFIG_FILES:
             source_config = source_path / config_file
             target_config = target_path / config_file
 
             if source_config.exists():
+                target_exists = target_config.exists()
                 config_info = {
                     "name": config_file.replace("/", "\\"),
                     "source_path": str(source_config),
                     "target_path": str(target_config),
-                    "exists_in_target": target_config.exists(),
+                    "exists_in_target": target_exists,
                     "content_match": False
                 }
 
-                if target_config.exists():
-                    try:
-                        source_content = source_config.read_text(encoding='utf-8', errors='ignore')
-                        target_content = target_config.read_text(encoding='utf-8', errors='ignore')
-                        config_info["content_match"] = source_content == target_content
-                    except Exception:
-                        config_info["content_match"] = False
+                if target_exists:
+                    pending_matches.append((config_info, source_config, target_config))
 
                 startup_configs.append(config_info)
 
@@ -625,28 +712,31 @@ class EnhancedVersionReplacer:
         peconfig_run_target = target_path / "Windows/System32/PEConfig/Run"
 
         if peconfig_run_source.exists():
-            for config_file in peconfig_run_source.rglob("*"):
-                if config_file.is_file():
-                    relative_path = config_file.relative_to(peconfig_run_source)
-                    target_config = peconfig_run_target / relative_path
-
-                    config_info = {
-                        "name": f"PEConfig/Run/{relative_path}",
-                        "source_path": str(config_file),
-                        "target_path": str(target_config),
-                        "exists_in_target": target_config.exists(),
-                        "content_match": False
-                    }
+            prefix_len = len(os.path.join(str(peconfig_run_source), ""))
+            for entry in walk_files(peconfig_run_source):
+                relative_path = entry.path[prefix_len:]
+                target_config = peconfig_run_target / relative_path
+                target_exists = target_config.exists()
 
-                    if target_config.exists():
-                        try:
-                            source_content = config_file.read_text(encoding='utf-8', errors='ignore')
-                            target_content = target_config.read_text(encoding='utf-8', errors='ignore')
-                            config_info["content_match"] = source_content == target_content
-                        except Exception:
-                            config_info["content_match"] = False
+                config_info = {
+                    "name": f"PEConfig/Run/{relative_path}",
+                    "source_path": entry.path,
+                    "target_path": str(target_config),
+                    "exists_in_target": target_exists,
+                    "content_match": False
+                }
 
-                    startup_configs.append(config_info)
+                if target_exists:
+                    pending_matches.append((config_info, entry.path, target_config))
+
+                startup_configs.append(config_info)
+
+        # 内容比较统一提交到线程池，hashlib计算摘要时释放GIL，多个文件可并行读取和计算
+        if pending_matches:
+            with ThreadPoolExecutor(max_workers=min(_DIGEST_WORKERS, len(pending_matches))) as executor:
+                matches = executor.map(lambda item: self._files_content_match(item[1], item[2]), pending_matches)
+                for (config_info, _, _), content_match in zip(pending_matches, matches):
+                    config_info["content_match"] = content_match
 
         return startup_configs
 
@@ -654,39 +744,45 @@ class EnhancedVersionReplacer:
         """分析桌面配置差异"""
         desktop_configs = []
 
-        # 查找桌面配置文件
-        config_patterns = [
-            "**/*.jcfg",
-            "**/*.lua",
-            "**/*.xml",
-            "**/*.theme"
-        ]
+        # 查找桌面配置文件，一次遍历源目录并按扩展名归类，代替每种扩展名各遍历一遍
+        prefix_len = len(os.path.join(str(source_path), ""))
+        for dir_path, dir_names, file_names in os.walk(source_path):
+            # 系统目录在进入前剪枝，WinSxS等大目录不再逐个遍历
+            dir_names[:] = [
+                name for name in dir_names
+                if not self._is_desktop_skip_path(os.path.join(dir_path, name))
+            ]
 
-        for pattern in config_patterns:
-            for config_file in source_path.glob(pattern):
+            for file_name in file_names:
+                if os.path.splitext(file_name)[1].lower() not in _DESKTOP_CONFIG_SUFFIXES:
+                    continue
+
+                config_file = os.path.join(dir_path, file_name)
                 # 跳过系统文件
-                if any(skip in str(config_file).lower() for skip in [
-                    "windows/system32/catroot",
-                    "windows/system32/wbem",
-                    "windows/winsxs"
-                ]):
+                if self._is_desktop_skip_path(config_file):
                     continue
 
-                relative_path = config_file.relative_to(source_path)
+                relative_path = config_file[prefix_len:]
                 target_config = target_path / relative_path
+                target_size = stat_size(target_config)
 
                 config_info = {
-                    "name": str(relative_path).replace("/", "\\"),
-                    "source_path": str(config_file),
+                    "name": relative_path.replace("/", "\\"),
+                    "source_path": config_file,
                     "target_path": str(target_config),
-                    "exists_in_target": target_config.exists(),
-                    "size_match": target_config.exists() and config_file.stat().st_size == target_config.stat().st_size
+                    "exists_in_target": target_size is not None,
+                    "size_match": target_size is not None and os.stat(config_file).st_size == target_size
                 }
 
                 desktop_configs.append(config_info)
 
         return desktop_configs
 
+    @staticmethod
+    def _is_desktop_skip_path(path: str) -> bool:
+        """判断路径是否位于桌面配置分析需要跳过的系统目录中"""
+        return _DESKTOP_CONFIG_SKIP_RE.search(path) is not None
+
     def _deep_compare_files(self, source_path: Path, target_path: Path) -> Dict:
         """深度比较文件结构"""
         differences = {
@@ -696,31 +792,20 @@ class EnhancedVersionReplacer:
         }
 
         # 比较关键目录
-        key_directories = [
-            "Windows/System32/PEConfig",
-            "Windows/System32/Drivers",
-            "Program Files"
-        ]
-
-        for directory in key_directories:
+        for directory in _DEEP_COMPARE_DIRS:
             source_dir = source_path / directory
             target_dir = target_path / directory
 
             if source_dir.exists():
-                # 获取源目录中的所有文件
-                source_files = set()
-                for file_path in source_dir.rglob("*"):
-                    if file_path.is_file():
-                        relative_path = file_path.relative_to(source_dir)
-                        source_files.add(str(relative_path))
+                # 获取源目录中的所有文件，相对路径直接按目录前缀长度切片得到
+                source_prefix_len = len(os.path.join(str(source_dir), ""))
+                source_files = {entry.path[source_prefix_len:] for entry in walk_files(source_dir)}
 
                 # 获取目标目录中的所有文件
                 target_files = set()
                 if target_dir.exists():
-                    for file_path in target_dir.rglob("*"):
-                        if file_path.is_file():
-                            relative_path = file_path.relative_to(target_dir)
-                            target_files.add(str(relative_path))
+                    target_prefix_len = len(os.path.join(str(target_dir), ""))
+                    target_files = {entry.path[target_prefix_len:] for entry in walk_files(target_dir)}
 
                 # 找出缺失的文件
                 missing_files = source_files - target_files
@@ -767,13 +852,12 @@ class EnhancedVersionReplacer:
                         # 复制整个目录
                         if target_path_program.exists():
                             shutil.rmtree(target_path_program)
-                        shutil.copytree(source_path, target_path_program, dirs_exist_ok=True)
+                        copy_tree_parallel(source_path, target_path_program)
                         self._log(f"外部程序目录复制成功: {program['name']}", "success")
                         success_count += 1
                     elif source_path.is_file():
-                        # 复制文件
-                        target_path_program.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy2(source_path, target_path_program)
+                        # 复制文件（目标目录已在上方创建）
+                        fast_copy2(source_path, target_path_program)
                         self._log(f"外部程序文件复制成功: {program['name']}", "success")
                         success_count += 1
                 else:
@@ -801,6 +885,7 @@ class EnhancedVersionReplacer:
         try:
             self._log("开始增强版WinPE版本替换流程（使用copype和MakeWinPEMedia）", "info")
             self._update_progress(0, "初始化增强版版本替换...")
+            self._dism_result_cache.clear()
 
             # 路径处理
             source_path = Path(source_dir)
@@ -861,29 +946,8 @@ class EnhancedVersionReplacer:
                         except Exception as e:
                             self._log(f"DISM卸载异常: {mount_point} - {str(e)}", "warning")
 
-                        # 无论卸载是否成功，都尝试删除目录
-                        try:
-                            import os
-                            if os.name == 'nt':  # Windows
-                                # 在Windows上使用rmdir /s /q强制删除
-                                import subprocess
-                                result = subprocess.run(
-                                    ['cmd', '/c', 'rmdir', '/s', '/q', str(mount_point)],
-                                    capture_output=True, text=True, creationflags=subprocess.CREATE_NO_WINDOW
-                                )
-                                if result.returncode == 0:
-                                    self._log(f"Windows强制删除成功: {mount_point}", "success")
-                                else:
-                                    self._log(f"Windows强制删除失败: {mount_point}", "warning")
-                            else:
-                                # 在Linux/Mac上使用rm -rf
-                                subprocess.run(['rm', '-rf', str(mount_point)], check=False)
-                        except Exception as e:
-                            self._log(f"强制删除失败: {mount_point} - {str(e)}", "warning")
-
-                # 最终删除整个WIN10REPLACED目录
+                # 挂载点都位于WIN10REPLACED目录内，统一由一次删除命令清理，避免逐个启动删除进程
                 try:
-                    import os
                     if os.name == 'nt':  # Windows
                         result = subprocess.run(
                             ['cmd', '/c', 'rmdir', '/s', '/q', str(output_path)],
@@ -943,7 +1007,7 @@ class EnhancedVersionReplacer:
             output_wim.parent.mkdir(parents=True, exist_ok=True)
 
             # 复制boot.wim文件
-            shutil.copy2(target_wim, output_wim)
+            fast_copy2(target_wim, output_wim, COPY_FILE_NO_BUFFERING)
             self._log("步骤2完成: boot.wim文件复制成功", "success")
             result["steps"]["boot_wim_copy"] = "completed"
 
@@ -1047,6 +1111,13 @@ class EnhancedVersionReplacer:
             List[Dict]: 特性信息列表
         """
         self._log("获取WinPE特性信息", "info")
+
+        cache_key = ("get-features", str(mount_dir))
+        cached = self._dism_result_cache.get(cache_key)
+        if cached is not None:
+            self._log(f"使用已缓存的WinPE特性信息: {len(cached)} 个", "info")
+            return list(cached)
+
         features = []
 
         try:
@@ -1060,19 +1131,17 @@ class EnhancedVersionReplacer:
             success, output = self.run_dism_command(command, "获取WinPE特性")
 
             if success:
-                # 解析DISM输出
-                lines = output.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if '|' in line and not line.startswith('Feature Name'):
-                        parts = [p.strip() for p in line.split('|')]
-                        if len(parts) >= 2:
-                            feature_info = {
-                                "name": parts[0],
-                                "state": parts[1] if len(parts) > 1 else "Unknown"
-                            }
-                            features.append(feature_info)
-                            self._log(f"发现特性: {feature_info['name']} - {feature_info['state']}", "info")
+                # 解析DISM输出，特性明细合并为一条日志，避免每个特性都触发一次日志回调
+                features = [
+                    {"name": name, "state": state}
+                    for name, state in _FEATURE_ROW_RE.findall(output)
+                ]
+                if features:
+                    self._log("\n".join(
+                        f"发现特性: {feature['name']} - {feature['state']}" for feature in features
+                    ), "info")
+
+                self._dism_result_cache[cache_key] = list(features)
 
             self._log(f"共发现 {len(features)} 个WinPE特性", "info")
             return features
@@ -1113,8 +1182,12 @@ class EnhancedVersionReplacer:
 
             # 分析特性差异
             self._log("分析特性差异...", "info")
-            source_features = self._get_winpe_features(str(source_mount))
-            target_features = self._get_winpe_features(str(target_mount))
+            # 源和目标是两个不同的挂载镜像，只读查询互不影响，两次DISM调用并行执行
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                source_future = executor.submit(self._get_winpe_features, str(source_mount))
+                target_future = executor.submit(self._get_winpe_features, str(target_mount))
+                source_features = source_future.result()
+                target_features = target_future.result()
 
             source_feature_names = {f["name"] for f in source_features if f["state"] == "Enabled"}
             target_feature_names = {f["name"] for f in target_features if f["state"] == "Enabled"}
@@ -1134,15 +1207,15 @@ class EnhancedVersionReplacer:
         registry_diffs = []
 
         try:
-            source_software = source_mount / "Windows" / "System32" / "Config" / "SOFTWARE"
-            target_software = target_mount / "Windows" / "System32" / "Config" / "SOFTWARE"
+            source_software = source_mount.joinpath(*_SOFTWARE_HIVE_PARTS)
+            target_software = target_mount.joinpath(*_SOFTWARE_HIVE_PARTS)
 
-            if source_software.exists() and target_software.exists():
-                # 这里可以添加更详细的注册表分析逻辑
-                # 目前只检查文件是否存在和大小
-                source_size = source_software.stat().st_size
-                target_size = target_software.stat().st_size
+            # 这里可以添加更详细的注册表分析逻辑
+            # 目前只检查文件是否存在和大小，一次stat同时得到两者
+            source_size = stat_size(source_software)
+            target_size = stat_size(target_software)
 
+            if source_size is not None and target_size is not None:
                 if abs(source_size - target_size) > 1024 * 1024:  # 1MB差异
                     registry_diffs.append({
                         "type": "software_hive",
@@ -1161,20 +1234,18 @@ class EnhancedVersionReplacer:
         missing_packages = []
 
         try:
-            source_winxsx = source_mount / "Windows" / "WinSxS" / "Manifests"
-            target_winxsx = target_mount / "Windows" / "WinSxS" / "Manifests"
+            source_winxsx = source_mount.joinpath(*_WINSXS_MANIFESTS_PARTS)
+            target_winxsx = target_mount.joinpath(*_WINSXS_MANIFESTS_PARTS)
 
             if source_winxsx.exists() and target_winxsx.exists():
                 # 获取源目录中的所有manifest文件
-                source_manifests = set()
-                for manifest_file in source_winxsx.glob("*.manifest"):
-                    source_manifests.add(manifest_file.name)
+                # Manifests目录通常有数万个条目，直接用scandir按文件名过滤，避免逐个构造Path对象
+                with os.scandir(source_winxsx) as entries:
+                    source_manifests = {entry.name for entry in entries if entry.name.lower().endswith(".manifest")}
 
                 # 获取目标目录中的所有manifest文件
-                target_manifests = set()
-                if target_winxsx.exists():
-                    for manifest_file in target_winxsx.glob("*.manifest"):
-                        target_manifests.add(manifest_file.name)
+                with os.scandir(target_winxsx) as entries:
+                    target_manifests = {entry.name for entry in entries if entry.name.lower().endswith(".manifest")}
 
                 # 找出缺失的manifest文件
                 missing_manifests = source_manifests - target_manifests
@@ -1262,6 +1333,9 @@ class EnhancedVersionReplacer:
                 "Windows/System32/startup"
             ]
 
+            # 多个外部程序目录共享同一父目录，每个父目录只创建一次
+            created_parents = set()
+
             for external_dir in external_dirs:
                 source_dir = source_path / external_dir
                 target_dir = target_path / external_dir
@@ -1270,19 +1344,20 @@ class EnhancedVersionReplacer:
                     self._log(f"复制外部程序目录: {external_dir}", "info")
                     try:
                         # 确保目标父目录存在
-                        target_dir.parent.mkdir(parents=True, exist_ok=True)
+                        if target_dir.parent not in created_parents:
+                            target_dir.parent.mkdir(parents=True, exist_ok=True)
+                            created_parents.add(target_dir.parent)
 
                         if source_dir.is_dir():
                             # 复制整个目录
                             if target_dir.exists():
                                 shutil.rmtree(target_dir, ignore_errors=True)
-                            shutil.copytree(source_dir, target_dir, dirs_exist_ok=True)
+                            copy_tree_parallel(source_dir, target_dir)
                             copied_programs.append(f"Directory: {external_dir}")
                             self._log(f"外部程序目录复制成功: {external_dir}", "success")
                         elif source_dir.is_file():
-                            # 复制文件
-                            target_dir.parent.mkdir(parents=True, exist_ok=True)
-                            shutil.copy2(source_dir, target_dir)
+                            # 复制文件（目标父目录已在上方创建）
+                            fast_copy2(source_dir, target_dir)
                             copied_programs.append(f"File: {external_dir}")
                             self._log(f"外部程序文件复制成功: {external_dir}", "success")
 
@@ -1326,18 +1401,20 @@ class EnhancedVersionReplacer:
                 source_file = source_path / config_file
                 target_file = target_path / config_file
 
-                if source_file.exists():
-                    try:
-                        # 确保目标目录存在
-                        target_file.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    # 重复执行时目标文件往往已与源文件一致，大小和修改时间相同则跳过复制
+                    if not file_needs_copy(source_file, target_file):
+                        copied_configs.append(config_file)
+                        self._log(f"WinXShell配置已是最新，跳过复制: {config_file}", "info")
+                        continue
 
-                        # 复制配置文件
-                        shutil.copy2(source_file, target_file)
+                    # 复制配置文件，源文件不存在时跳过
+                    if self._copy_file_if_exists(source_file, target_file):
                         copied_configs.append(config_file)
                         self._log(f"WinXShell配置复制成功: {config_file}", "success")
 
-                    except Exception as e:
-                        self._log(f"复制WinXShell配置失败: {config_file} - {str(e)}", "error")
+                except Exception as e:
+                    self._log(f"复制WinXShell配置失败: {config_file} - {str(e)}", "error")
 
             # 复制WinXShell主程序和配置目录
             winxshell_program_dir = source_path / "Program Files/WinXShell"
@@ -1347,7 +1424,7 @@ class EnhancedVersionReplacer:
                     target_winxshell_dir.parent.mkdir(parents=True, exist_ok=True)
                     if target_winxshell_dir.exists():
                         shutil.rmtree(target_winxshell_dir, ignore_errors=True)
-                    shutil.copytree(winxshell_program_dir, target_winxshell_dir, dirs_exist_ok=True)
+                    copy_tree_parallel(winxshell_program_dir, target_winxshell_dir)
                     copied_configs.append("Program Files/WinXShell")
                     self._log("WinXShell程序目录复制成功", "success")
 
@@ -1387,6 +1464,24 @@ class EnhancedVersionReplacer:
         except Exception as e:
             self._log(f"WinXShell自启动设置失败: {str(e)}", "error")
 
+    @staticmethod
+    def _copy_file_if_exists(source_file: Union[str, Path], target_file: Union[str, Path]) -> bool:
+        """复制文件，源文件不存在时返回False
+
+        源文件和目标目录通常都已存在，直接复制即可，无需先探测；
+        复制报告文件不存在时再区分是源文件缺失还是目标目录尚未创建
+        """
+        try:
+            fast_copy2(source_file, target_file)
+            return True
+        except FileNotFoundError:
+            if not os.path.exists(source_file):
+                return False
+
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        fast_copy2(source_file, target_file)
+        return True
+
     def _copy_config_files(self, source_mount: str, target_mount: str, mount_differences: Dict):
         """复制配置文件"""
         source_path = Path(source_mount)
@@ -1396,13 +1491,8 @@ class EnhancedVersionReplacer:
         startup_configs = mount_differences.get("startup_configs", [])
         for config in startup_configs:
             if not config.get("exists_in_target") or not config.get("content_match", False):
-                source_config = Path(config["source_path"])
-                target_config = Path(config["target_path"])
-
                 try:
-                    if source_config.exists():
-                        target_config.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy2(source_config, target_config)
+                    if self._copy_file_if_exists(config["source_path"], config["target_path"]):
                         self._log(f"启动配置复制成功: {config['name']}", "success")
                 except Exception as e:
                     self._log(f"启动配置复制失败: {config['name']} - {str(e)}", "error")
@@ -1411,13 +1501,8 @@ class EnhancedVersionReplacer:
         desktop_configs = mount_differences.get("desktop_configs", [])
         for config in desktop_configs:
             if not config.get("exists_in_target"):
-                source_config = Path(config["source_path"])
-                target_config = Path(config["target_path"])
-
                 try:
-                    if source_config.exists():
-                        target_config.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy2(source_config, target_config)
+                    if self._copy_file_if_exists(config["source_path"], config["target_path"]):
                         self._log(f"桌面配置复制成功: {config['name']}", "success")
                 except Exception as e:
                     self._log(f"桌面配置复制失败: {config['name']} - {str(e)}", "error")
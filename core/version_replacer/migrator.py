@@ -8,10 +8,34 @@
 import os
 import shutil
 import stat
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Union
 
 from utils.logger import get_logger
+from utils.file_utils import fast_copy2, file_needs_copy, robocopy_tree
+
+# 系统自带文件（小写），迁移时不覆盖
+_SYSTEM_FILES = frozenset({
+    "cmd.exe", "powershell.exe", "reg.exe", "sfc.exe", "chkdsk.exe",
+    "format.com", "diskpart.exe", "bcdedit.exe", "bootsect.exe",
+    "wpeinit.exe", "wpeutil.exe", "winpeshl.exe", "winload.exe",
+    "winpe.wim", "setup.exe", "bootmgr.exe"
+})
+
+# 视为自定义工具的文件扩展名
+_TOOL_SUFFIXES = frozenset({".exe", ".msi", ".bat", ".cmd", ".ps1"})
+
+# 需要整体迁移的自定义组件目录：(相对挂载目录的路径, 名称)
+_CUSTOM_COMPONENT_DIRS = (
+    (("Windows", "System32", "PEConfig"), "PEConfig目录"),
+    (("Windows", "System32", "Programs"), "Programs目录"),
+    (("Drivers",), "Drivers目录"),
+    (("Scripts",), "Scripts目录"),
+)
+
+# 目录复制时并行复制文件的最大线程数，避免同时打开过多文件句柄
+_COPY_WORKERS = 8
 
 
 class ComponentMigrator:
@@ -19,6 +43,10 @@ class ComponentMigrator:
 
     def __init__(self):
         self.logger = get_logger("ComponentMigrator")
+        # 本次迁移中已确保存在的目标目录，同一目录下的多个文件只需创建一次
+        self._created_dirs = set()
+        # 本次迁移中源目录的文件列表缓存，WinXShell、Cairo、自定义工具共用同一次System32列表
+        self._dir_cache: Dict[str, List[os.DirEntry]] = {}
 
     def execute_migration(self, migration_plan: Dict[str, Any], source_mount: Path, output_mount: Path) -> Dict[str, Any]:
         """
@@ -41,6 +69,8 @@ class ComponentMigrator:
 
         try:
             self.logger.info("开始执行组件迁移...")
+            self._created_dirs.clear()
+            self._dir_cache.clear()
 
             # 迁移外部程序
             for program in migration_plan.get("migrate_external_programs", []):
@@ -109,27 +139,28 @@ class ComponentMigrator:
     def _migrate_winxshell(self, source_system32: Path, output_system32: Path, source_mount: Path, output_mount: Path) -> bool:
         """迁移WinXShell"""
         try:
-            # 迁移System32中的WinXShell相关文件
-            patterns = ["WinXShell*", "*.jcfg", "*.lua"]
+            # 迁移System32中的WinXShell相关文件（WinXShell*, *.jcfg, *.lua），一次列目录完成匹配
             migrated_files = 0
 
-            for pattern in patterns:
-                for source_file in source_system32.glob(pattern):
-                    if source_file.is_file():
-                        target_file = output_system32 / source_file.name
-                        success = self._copy_file_with_permission_handling(source_file, target_file)
-                        if success:
-                            migrated_files += 1
-                            self.logger.debug(f"迁移WinXShell文件: {source_file.name}")
+            for entry in self._list_dir_files(source_system32):
+                name = entry.name.lower()
+                if name.startswith("winxshell") or name.endswith((".jcfg", ".lua")):
+                    target_file = os.path.join(output_system32, entry.name)
+                    success = self._copy_file_with_permission_handling(entry.path, target_file)
+                    if success:
+                        migrated_files += 1
+                        self.logger.debug(f"迁移WinXShell文件: {entry.name}")
 
             # 迁移Program Files中的WinXShell
             source_programs = source_mount / "Program Files" / "WinXShell"
             if source_programs.exists():
                 output_programs = output_mount / "Program Files" / "WinXShell"
-                success = self._copy_tree_with_permission_handling(source_programs, output_programs)
+                # 复制时顺带统计条目数，无需复制完成后再遍历一遍源目录
+                copy_stats = {"entries": 0}
+                success = self._copy_tree_with_permission_handling(source_programs, output_programs, copy_stats)
                 if success:
                     self.logger.info(f"迁移WinXShell程序目录: {source_programs}")
-                    migrated_files += len(list(source_programs.rglob("*")))
+                    migrated_files += copy_stats["entries"]
 
             self.logger.info(f"WinXShell迁移完成，共迁移 {migrated_files} 个文件")
             return migrated_files > 0
@@ -141,17 +172,17 @@ class ComponentMigrator:
     def _migrate_cairo_shell(self, source_system32: Path, output_system32: Path) -> bool:
         """迁移Cairo Shell"""
         try:
-            patterns = ["Cairo*", "*.cairo"]
+            # 迁移Cairo相关文件（Cairo*, *.cairo），一次列目录完成匹配
             migrated_files = 0
 
-            for pattern in patterns:
-                for source_file in source_system32.glob(pattern):
-                    if source_file.is_file():
-                        target_file = output_system32 / source_file.name
-                        success = self._copy_file_with_permission_handling(source_file, target_file)
-                        if success:
-                            migrated_files += 1
-                            self.logger.debug(f"迁移Cairo文件: {source_file.name}")
+            for entry in self._list_dir_files(source_system32):
+                name = entry.name.lower()
+                if name.startswith("cairo") or name.endswith(".cairo"):
+                    target_file = os.path.join(output_system32, entry.name)
+                    success = self._copy_file_with_permission_handling(entry.path, target_file)
+                    if success:
+                        migrated_files += 1
+                        self.logger.debug(f"迁移Cairo文件: {entry.name}")
 
             self.logger.info(f"Cairo Shell迁移完成，共迁移 {migrated_files} 个文件")
             return migrated_files > 0
@@ -165,17 +196,16 @@ class ComponentMigrator:
         try:
             migrated_files = 0
 
-            for source_file in source_system32.glob("*"):
-                if (source_file.is_file() and
-                    source_file.suffix.lower() in [".exe", ".msi", ".bat", ".cmd", ".ps1"] and
-                    not self._is_system_file(source_file.name)):
+            for entry in self._list_dir_files(source_system32):
+                if (os.path.splitext(entry.name)[1].lower() in _TOOL_SUFFIXES and
+                    not self._is_system_file(entry.name)):
 
-                    target_file = output_system32 / source_file.name
-                    if not target_file.exists():
-                        success = self._copy_file_with_permission_handling(source_file, target_file)
+                    target_file = os.path.join(output_system32, entry.name)
+                    if not os.path.exists(target_file):
+                        success = self._copy_file_with_permission_handling(entry.path, target_file)
                         if success:
                             migrated_files += 1
-                            self.logger.debug(f"迁移自定义工具: {source_file.name}")
+                            self.logger.debug(f"迁移自定义工具: {entry.name}")
 
             self.logger.info(f"自定义工具迁移完成，共迁移 {migrated_files} 个文件")
             return migrated_files > 0
@@ -201,7 +231,7 @@ class ComponentMigrator:
             target_file = output_mount / script_path
 
             if source_file.exists():
-                target_file.parent.mkdir(parents=True, exist_ok=True)
+                # 目标父目录由复制函数统一创建
                 success = self._copy_file_with_permission_handling(source_file, target_file)
                 if success:
                     self.logger.debug(f"迁移启动脚本: {script_path}")
@@ -230,7 +260,7 @@ class ComponentMigrator:
             target_file = output_mount / driver_path
 
             if source_file.exists():
-                target_file.parent.mkdir(parents=True, exist_ok=True)
+                # 目标父目录由复制函数统一创建
                 success = self._copy_file_with_permission_handling(source_file, target_file)
                 if success:
                     self.logger.debug(f"迁移驱动程序: {driver_path}")
@@ -247,41 +277,23 @@ class ComponentMigrator:
         try:
             migrated_components = []
 
-            # 迁移PEConfig目录
-            source_peconfig = source_mount / "Windows" / "System32" / "PEConfig"
-            if source_peconfig.exists():
-                output_peconfig = output_mount / "Windows" / "System32" / "PEConfig"
-                success = self._copy_tree_with_permission_handling(source_peconfig, output_peconfig)
-                if success:
-                    migrated_components.append("PEConfig目录")
-                    self.logger.info("迁移PEConfig目录")
-
-            # 迁移Programs目录
-            source_programs = source_mount / "Windows" / "System32" / "Programs"
-            if source_programs.exists():
-                output_programs = output_mount / "Windows" / "System32" / "Programs"
-                success = self._copy_tree_with_permission_handling(source_programs, output_programs)
-                if success:
-                    migrated_components.append("Programs目录")
-                    self.logger.info("迁移Programs目录")
-
-            # 迁移Drivers目录
-            source_drivers = source_mount / "Drivers"
-            if source_drivers.exists():
-                output_drivers = output_mount / "Drivers"
-                success = self._copy_tree_with_permission_handling(source_drivers, output_drivers)
-                if success:
-                    migrated_components.append("Drivers目录")
-                    self.logger.info("迁移Drivers目录")
-
-            # 迁移Scripts目录
-            source_scripts = source_mount / "Scripts"
-            if source_scripts.exists():
-                output_scripts = output_mount / "Scripts"
-                success = self._copy_tree_with_permission_handling(source_scripts, output_scripts)
-                if success:
-                    migrated_components.append("Scripts目录")
-                    self.logger.info("迁移Scripts目录")
+            # 各目录互不重叠，同时复制以重叠各自的I/O等待；结果按表中顺序汇总
+            copy_jobs = []
+            for relative_parts, label in _CUSTOM_COMPONENT_DIRS:
+                source_dir = source_mount.joinpath(*relative_parts)
+                if source_dir.exists():
+                    copy_jobs.append((label, source_dir, output_mount.joinpath(*relative_parts)))
+
+            if copy_jobs:
+                with ThreadPoolExecutor(max_workers=len(copy_jobs)) as executor:
+                    futures = [
+                        (label, executor.submit(self._copy_tree_with_permission_handling, source_dir, output_dir))
+                        for label, source_dir, output_dir in copy_jobs
+                    ]
+                    for label, future in futures:
+                        if future.result():
+                            migrated_components.append(label)
+                            self.logger.info(f"迁移{label}")
 
             # 更新结果
             result["migrated_items"].extend(migrated_components)
@@ -290,31 +302,41 @@ class ComponentMigrator:
             self.logger.error(f"迁移自定义组件时出现问题: {str(e)}")
             result["warnings"].append(f"迁移自定义组件时出现问题: {str(e)}")
 
-    def _copy_file_with_permission_handling(self, src: Path, dst: Path) -> bool:
+    def _copy_file_with_permission_handling(self, src: Union[str, Path], dst: Union[str, Path],
+                                            make_parent: bool = True) -> bool:
         """
         带权限处理的文件复制
 
         Args:
             src: 源文件路径
             dst: 目标文件路径
+            make_parent: 是否确保目标目录存在，调用方已创建时可跳过
 
         Returns:
             是否复制成功
         """
         try:
-            # 确保目标目录存在
-            dst.parent.mkdir(parents=True, exist_ok=True)
-
-            # 如果目标文件存在且是只读的，先删除
-            if dst.exists():
+            # 目标文件与源文件大小和修改时间一致时视为已是最新，与robocopy的默认行为一致
+            if not file_needs_copy(src, dst):
+                return True
+
+            # 确保目标目录存在，已创建过的目录不再重复创建
+            if make_parent:
+                parent = os.path.dirname(dst)
+                if parent not in self._created_dirs:
+                    os.makedirs(parent, exist_ok=True)
+                    self._created_dirs.add(parent)
+
+            # 复制文件；只有目标文件只读导致拒绝访问时才移除只读属性后重试，
+            # 无需对每个文件都预先chmod
+            try:
+                fast_copy2(src, dst)
+            except PermissionError:
                 try:
-                    # 移除只读属性
-                    dst.chmod(stat.S_IWRITE | stat.S_IREAD)
-                except (PermissionError, OSError):
-                    pass  # 忽略权限错误
-
-            # 复制文件
-            shutil.copy2(src, dst)
+                    os.chmod(dst, stat.S_IWRITE | stat.S_IREAD)
+                except OSError:
+                    pass  # 忽略权限错误，由重试结果决定是否走备用复制方法
+                fast_copy2(src, dst)
             return True
 
         except (PermissionError, OSError) as e:
@@ -332,32 +354,63 @@ class ComponentMigrator:
                 self.logger.error(f"复制文件失败: {src} - {str(e)}")
                 return False
 
-    def _copy_tree_with_permission_handling(self, src: Path, dst: Path) -> bool:
+    def _copy_tree_with_permission_handling(self, src: Path, dst: Path,
+                                            stats: Optional[Dict[str, int]] = None) -> bool:
         """
         带权限处理的目录复制
 
         Args:
             src: 源目录路径
             dst: 目标目录路径
+            stats: 可选的统计字典，复制过程中累加遍历到的条目数到 "entries"
 
         Returns:
             是否复制成功
         """
-        try:
-            if not dst.exists():
-                dst.mkdir(parents=True, exist_ok=True)
-
-            for item in src.iterdir():
-                dst_item = dst / item.name
+        # 不需要统计条目数时优先交给robocopy多线程复制，失败或不可用时回退到下面的逐文件复制
+        if stats is None and robocopy_tree(src, dst):
+            self.logger.debug(f"robocopy复制目录成功: {src} -> {dst}")
+            return True
 
-                if item.is_dir():
-                    success = self._copy_tree_with_permission_handling(item, dst_item)
-                    if not success:
-                        self.logger.warning(f"复制子目录失败: {item}")
-                elif item.is_file():
-                    success = self._copy_file_with_permission_handling(item, dst_item)
-                    if not success:
-                        self.logger.warning(f"复制文件失败: {item}")
+        try:
+            # 先同步遍历源目录并创建目标目录结构，文件复制再统一提交到线程池，避免并发创建目录
+            # 遍历过程中只使用字符串路径，不再为每个条目构造Path对象
+            root_src = os.fspath(src)
+            file_jobs = []
+            pending = [(root_src, os.fspath(dst))]
+            while pending:
+                current_src, current_dst = pending.pop()
+                try:
+                    os.makedirs(current_dst, exist_ok=True)
+                    with os.scandir(current_src) as it:
+                        entries = list(it)
+                except Exception as e:
+                    if current_src == root_src:
+                        raise
+                    self.logger.error(f"复制目录时出现问题: {current_src} -> {current_dst}, 错误: {str(e)}")
+                    self.logger.warning(f"复制子目录失败: {current_src}")
+                    continue
+
+                for entry in entries:
+                    if stats is not None:
+                        stats["entries"] += 1
+
+                    dst_item = os.path.join(current_dst, entry.name)
+                    if entry.is_dir():
+                        pending.append((entry.path, dst_item))
+                    elif entry.is_file():
+                        file_jobs.append((entry.path, dst_item))
+
+            # 逐个文件复制主要耗在打开/关闭句柄的系统调用上，多线程可重叠这部分等待
+            if file_jobs:
+                with ThreadPoolExecutor(max_workers=min(_COPY_WORKERS, len(file_jobs))) as executor:
+                    futures = {
+                        executor.submit(self._copy_file_with_permission_handling, src_item, dst_item, False): src_item
+                        for src_item, dst_item in file_jobs
+                    }
+                    for future in as_completed(futures):
+                        if not future.result():
+                            self.logger.warning(f"复制文件失败: {futures[future]}")
 
             return True
 
@@ -365,15 +418,37 @@ class ComponentMigrator:
             self.logger.error(f"复制目录时出现问题: {src} -> {dst}, 错误: {str(e)}")
             return False
 
+    def _list_dir_files(self, directory: Path) -> List[os.DirEntry]:
+        """列出目录下的文件条目，目录不存在时返回空列表
+
+        结果在单次迁移内缓存，迁移只写入输出目录，源目录列表不会变化
+        """
+        key = os.fspath(directory)
+        files = self._dir_cache.get(key)
+        if files is None:
+            try:
+                with os.scandir(key) as entries:
+                    files = [entry for entry in entries if entry.is_file()]
+            except OSError:
+                files = []
+            self._dir_cache[key] = files
+        return files
+
+    @staticmethod
+    def _dir_has_name_prefix(directory: Path, prefix: str) -> bool:
+        """判断目录中是否存在以指定前缀（小写，不区分大小写）开头的条目，找到第一个即返回"""
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.lower().startswith(prefix):
+                        return True
+        except OSError:
+            pass
+        return False
+
     def _is_system_file(self, filename: str) -> bool:
         """判断是否为系统文件"""
-        system_files = {
-            "cmd.exe", "powershell.exe", "reg.exe", "sfc.exe", "chkdsk.exe",
-            "format.com", "diskpart.exe", "bcdedit.exe", "bootsect.exe",
-            "wpeinit.exe", "wpeutil.exe", "winpeshl.exe", "winload.exe",
-            "winpe.wim", "setup.exe", "bootmgr.exe"
-        }
-        return filename.lower() in system_files
+        return filename.lower() in _SYSTEM_FILES
 
     def verify_migration_result(self, output_mount: Path, migration_plan: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -402,13 +477,13 @@ class ComponentMigrator:
 
             for program in external_programs:
                 if program == "WinXShell":
-                    winxshell_found = any(system32.glob("WinXShell*"))
+                    winxshell_found = self._dir_has_name_prefix(system32, "winxshell")
                     external_verification["winxshell"] = winxshell_found
                     if not winxshell_found:
                         result["warnings"].append("WinXShell迁移验证失败")
 
                 elif program == "Cairo Shell":
-                    cairo_found = any(system32.glob("Cairo*"))
+                    cairo_found = self._dir_has_name_prefix(system32, "cairo")
                     external_verification["cairo_shell"] = cairo_found
                     if not cairo_found:
                         result["warnings"].append("Cairo Shell迁移验证失败")
@@ -420,9 +495,9 @@ class ComponentMigrator:
             scripts_verification = {}
 
             for script in startup_scripts:
-                script_path = output_mount / script
-                scripts_verification[script] = script_path.exists()
-                if not script_path.exists():
+                script_exists = (output_mount / script).exists()
+                scripts_verification[script] = script_exists
+                if not script_exists:
                     result["warnings"].append(f"启动脚本迁移验证失败: {script}")
 
             result["verification_details"]["startup_scripts"] = scripts_verification
@@ -6,12 +6,15 @@
 """
 
 import os
+import itertools
 import shutil
 import subprocess
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 
+from utils.file_utils import index_files_by_name, get_directory_usage, fast_copy2, COPY_FILE_NO_BUFFERING
+
 logger = logging.getLogger("WinPEManager")
 
 
@@ -313,11 +316,12 @@ copype工具执行失败！
                 logger.error("未找到winpe.wim文件")
                 # 列出可用的文件供调试
                 try:
-                    available_files = list(winpe_arch_path.rglob("*.wim"))
+                    # 只取前几项用于调试输出，取够即停止遍历
+                    available_files = list(itertools.islice(winpe_arch_path.rglob("*.wim"), 5))
                     if available_files:
-                        logger.info(f"可用的WIM文件: {[str(f) for f in available_files[:5]]}")
+                        logger.info(f"可用的WIM文件: {[str(f) for f in available_files]}")
                     else:
-                        logger.info(f"架构目录内容: {list(winpe_arch_path.iterdir())[:10]}")
+                        logger.info(f"架构目录内容: {list(itertools.islice(winpe_arch_path.iterdir(), 10))}")
                 except:
                     pass
                 return False, "找不到WinPE基础镜像文件"
@@ -339,7 +343,8 @@ copype工具执行失败！
 
             import time
             start_time = time.time()
-            shutil.copy2(winpe_wim, boot_wim_target)
+            # WIM只顺序复制一次，绕过系统缓存避免挤占其他文件的缓存
+            fast_copy2(winpe_wim, boot_wim_target, COPY_FILE_NO_BUFFERING)
             copy_time = time.time() - start_time
 
             # 验证复制结果
@@ -449,7 +454,7 @@ copype工具执行失败！
                     optional_missing = [str(f.name) for f in optional_boot_files if not f.exists()]
 
                     if not critical_missing:
-                        total_size = sum(f.stat().st_size for f in target_media.rglob("*") if f.is_file())
+                        total_size = get_directory_usage(target_media)[1]
                         logger.info(f"✅ Media目录复制成功，包含 {media_files} 个文件/目录，总大小 {total_size/(1024*1024):.1f} MB")
                         logger.info(f"✅ 所有关键启动文件完整: {len(critical_boot_files) - len(critical_missing)} 个")
 
@@ -531,6 +536,7 @@ copype工具执行失败！
 
         logger.info(f"启动文件搜索路径数量: {len(search_paths)}")
 
+        name_indexes = {}
         for missing_file in missing_files:
             # boot.wim文件应该从定制的WinPE镜像复制，不在这里搜索
             if missing_file == "boot.wim":
@@ -540,17 +546,15 @@ copype工具执行失败！
             found_file = None
             logger.info(f"搜索文件: {missing_file}")
 
-            # 在所有搜索路径中查找文件
+            # 在所有搜索路径中查找文件（每个路径只遍历一次，结果按文件名索引复用）
             for search_path in search_paths:
-                if search_path and search_path.exists():
-                    # 递归搜索文件
-                    for found_path in search_path.rglob(missing_file):
-                        if found_path.is_file():
-                            found_file = found_path
-                            logger.info(f"找到文件: {found_path}")
-                            break
-                    if found_file:
-                        break
+                if search_path not in name_indexes:
+                    name_indexes[search_path] = index_files_by_name(search_path)
+                found_path = name_indexes[search_path].get(os.path.normcase(missing_file))
+                if found_path:
+                    found_file = found_path
+                    logger.info(f"找到文件: {found_path}")
+                    break
 
             # 如果找到文件，复制到目标位置
             if found_file:
@@ -658,6 +662,7 @@ copype工具执行失败！
                 ])
 
             # 尝试查找并复制每个文件
+            name_indexes = {}
             for filename, info in required_files.items():
                 target_subdir, description = info
                 if target_subdir:
@@ -672,11 +677,9 @@ copype工具执行失败！
 
                 found_source = None
                 for search_path in search_paths:
-                    if search_path and search_path.exists():
-                        for source_file in search_path.rglob(filename):
-                            if source_file.is_file():
-                                found_source = source_file
-                                break
+                    if search_path not in name_indexes:
+                        name_indexes[search_path] = index_files_by_name(search_path)
+                    found_source = name_indexes[search_path].get(os.path.normcase(filename))
                     if found_source:
                         break
 
@@ -13,6 +13,9 @@ import logging
 
 logger = logging.getLogger("WinPEManager")
 
+# WinXShell支持文件后缀（小写）
+_WINXSHELL_SUPPORT_SUFFIXES = frozenset({'.lua', '.dll', '.ini'})
+
 
 class BootConfig:
     """WinPE启动配置管理器"""
@@ -453,10 +456,19 @@ if exist "%~dp0%1\\*.bat" (
             if winxshell_source.exists():
                 import shutil
                 copied_files = []
-                for exe_file in winxshell_source.glob("*.exe"):
-                    shutil.copy2(exe_file, winxshell_config_dir / exe_file.name)
-                    copied_files.append(exe_file.name)
-                    logger.info(f"📦 复制程序文件: {exe_file.name}")
+                # 单次遍历目录，按后缀分别复制程序文件和支持文件
+                with os.scandir(winxshell_source) as entries:
+                    for entry in entries:
+                        if not entry.is_file():
+                            continue
+                        suffix = os.path.splitext(entry.name)[1].lower()
+                        if suffix == '.exe':
+                            shutil.copy2(entry.path, winxshell_config_dir / entry.name)
+                            copied_files.append(entry.name)
+                            logger.info(f"📦 复制程序文件: {entry.name}")
+                        elif suffix in _WINXSHELL_SUPPORT_SUFFIXES:
+                            shutil.copy2(entry.path, winxshell_config_dir / entry.name)
+                            logger.info(f"📦 复制支持文件: {entry.name}")
 
                 # 复制配置文件
                 jcfg_source = winxshell_source / "WinXShell.jcfg"
@@ -464,12 +476,6 @@ if exist "%~dp0%1\\*.bat" (
                     shutil.copy2(jcfg_source, winxshell_config_dir / "WinXShell.jcfg")
                     logger.info("📦 复制配置文件: WinXShell.jcfg")
 
-                # 复制所有支持文件
-                for other_file in winxshell_source.glob("*"):
-                    if other_file.is_file() and other_file.suffix.lower() in ['.lua', '.dll', '.ini']:
-                        shutil.copy2(other_file, winxshell_config_dir / other_file.name)
-                        logger.info(f"📦 复制支持文件: {other_file.name}")
-
                 log_build_step("文件复制", f"共复制 {len(copied_files)} 个程序文件")
             else:
                 log_build_step("WinXShell程序", "⚠️ 未找到本地WinXShell文件，将使用默认配置", "warning")
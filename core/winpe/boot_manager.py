@@ -6,14 +6,21 @@
 """
 
 import os
+import re
 import shutil
 import subprocess
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 
+from utils.file_utils import index_files_by_name
+
 logger = logging.getLogger("WinPEManager")
 
+# 关键启动文件/目录的路径关键字，合并为单个正则一次扫描完成匹配
+_BOOT_FILE_KEYWORD_RE = re.compile(r"boot|efi|bcd|wim", re.IGNORECASE | re.ASCII)
+_BOOT_DIR_KEYWORD_RE = re.compile(r"boot|efi|sources", re.IGNORECASE | re.ASCII)
+
 
 class BootManager:
     """WinPE启动文件管理器"""
@@ -242,6 +249,7 @@ class BootManager:
 
         logger.info(f"启动文件搜索路径数量: {len(search_paths)}")
 
+        name_indexes = {}
         for missing_file in missing_files:
             # boot.wim文件应该从定制的WinPE镜像复制，不在这里搜索
             if missing_file == "boot.wim":
@@ -251,17 +259,15 @@ class BootManager:
             found_file = None
             logger.info(f"搜索文件: {missing_file}")
 
-            # 在所有搜索路径中查找文件
+            # 在所有搜索路径中查找文件（每个路径只遍历一次，结果按文件名索引复用）
             for search_path in search_paths:
-                if search_path and search_path.exists():
-                    # 递归搜索文件
-                    for found_path in search_path.rglob(missing_file):
-                        if found_path.is_file():
-                            found_file = found_path
-                            logger.info(f"找到文件: {found_path}")
-                            break
-                    if found_file:
-                        break
+                if search_path not in name_indexes:
+                    name_indexes[search_path] = index_files_by_name(search_path)
+                found_path = name_indexes[search_path].get(os.path.normcase(missing_file))
+                if found_path:
+                    found_file = found_path
+                    logger.info(f"找到文件: {found_path}")
+                    break
 
             # 如果找到文件，复制到目标位置
             if found_file:
@@ -369,6 +375,7 @@ class BootManager:
                 ])
 
             # 尝试查找并复制每个文件
+            name_indexes = {}
             for filename, info in required_files.items():
                 target_subdir, description = info
                 if target_subdir:
@@ -383,11 +390,9 @@ class BootManager:
 
                 found_source = None
                 for search_path in search_paths:
-                    if search_path and search_path.exists():
-                        for source_file in search_path.rglob(filename):
-                            if source_file.is_file():
-                                found_source = source_file
-                                break
+                    if search_path not in name_indexes:
+                        name_indexes[search_path] = index_files_by_name(search_path)
+                    found_source = name_indexes[search_path].get(os.path.normcase(filename))
                     if found_source:
                         break
 
@@ -481,30 +486,46 @@ class BootManager:
             if not media_dir.exists():
                 return boot_info
 
-            # 统计文件和目录
-            for item in media_dir.rglob("*"):
-                if item.is_file():
-                    boot_info["file_count"] += 1
-                    boot_info["total_size"] += item.stat().st_size
-                    
-                    # 记录关键启动文件信息
-                    relative_path = item.relative_to(media_dir)
-                    if any(keyword in str(relative_path).lower() for keyword in ["boot", "efi", "bcd", "wim"]):
-                        boot_info["files"][str(relative_path)] = {
-                            "size": item.stat().st_size,
-                            "size_mb": round(item.stat().st_size / (1024 * 1024), 2),
-                            "modified": item.stat().st_mtime
-                        }
-                elif item.is_dir():
+            # 统计文件和目录（scandir遍历，每个文件只stat一次）
+            root = str(media_dir)
+            prefix_len = len(os.path.join(root, ""))
+            pending = [root]
+            while pending:
+                current = pending.pop()
+                try:
+                    with os.scandir(current) as it:
+                        entries = list(it)
+                except OSError:
+                    # 无法读取的子目录跳过，不中断整个统计
+                    continue
+
+                if current != root:
                     boot_info["directory_count"] += 1
-                    
+
                     # 记录关键目录信息
-                    relative_path = item.relative_to(media_dir)
-                    if any(keyword in str(relative_path).lower() for keyword in ["boot", "efi", "sources"]):
-                        boot_info["directories"][str(relative_path)] = {
-                            "item_count": len(list(item.iterdir()))
+                    relative_path = current[prefix_len:]
+                    if _BOOT_DIR_KEYWORD_RE.search(relative_path):
+                        boot_info["directories"][relative_path] = {
+                            "item_count": len(entries)
                         }
 
+                for entry in entries:
+                    if entry.is_file():
+                        file_stat = entry.stat()
+                        boot_info["file_count"] += 1
+                        boot_info["total_size"] += file_stat.st_size
+
+                        # 记录关键启动文件信息
+                        relative_path = entry.path[prefix_len:]
+                        if _BOOT_FILE_KEYWORD_RE.search(relative_path):
+                            boot_info["files"][relative_path] = {
+                                "size": file_stat.st_size,
+                                "size_mb": round(file_stat.st_size / (1024 * 1024), 2),
+                                "modified": file_stat.st_mtime
+                            }
+                    elif entry.is_dir():
+                        pending.append(entry.path)
+
             # 转换总大小为MB
             boot_info["total_size_mb"] = round(boot_info["total_size"] / (1024 * 1024), 2)
 
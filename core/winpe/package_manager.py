@@ -6,13 +6,21 @@
 """
 
 import os
+import re
 import shutil
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 
+from utils.file_utils import fast_copy2
+
 logger = logging.getLogger("WinPEManager")
 
+# DISM批量添加包时每个包开头的进度行，如 "Processing 2 of 5 - Adding package ..."
+_DISM_PACKAGE_STEP_RE = re.compile(r"^\s*(?:Processing|正在处理)\D*?(\d+)\s*(?:of|/|\(共)\s*(\d+)", re.MULTILINE)
+# DISM输出中表示出错的标记
+_DISM_ERROR_RE = re.compile(r"error|错误|0x8[0-9a-f]{7}", re.IGNORECASE)
+
 
 class PackageManager:
     """WinPE包和驱动管理器"""
@@ -55,6 +63,11 @@ class PackageManager:
             language_count = 0
             other_count = 0
 
+            # 先解析所有包文件路径，找到的包再统一交给DISM；
+            # WinPE_OCs目录只列一次，逐个包查表，无需每个包都探测多个路径
+            architecture = self.config.get("winpe.architecture", "amd64")
+            package_index = self._index_package_files(architecture)
+            found_packages = []
             for i, package_id in enumerate(package_ids, 1):
                 # 判断是否为语言包
                 is_language_package = package_id in language_packages
@@ -62,50 +75,82 @@ class PackageManager:
 
                 logger.info(f"[{i}/{len(package_ids)}] 正在处理 {package_type}: {package_id}")
 
-                # 构建包路径
-                package_path = self.adk.adk_path / "Assessment and Deployment Kit" / "Windows Preinstallation Environment" / \
-                               self.config.get("winpe.architecture", "amd64") / "WinPE_OCs" / f"{package_id}.cab"
-
-                if not package_path.exists():
-                    # 尝试其他可能的路径
-                    package_path = self.adk.winpe_path / self.config.get("winpe.architecture", "amd64") / "WinPE_OCs" / f"{package_id}.cab"
+                # 查找包路径
+                package_file = package_index.get(f"{package_id}.cab".lower())
+                if not package_file:
+                    # 索引中没有（如包ID带子目录），按原有路径逐个探测
+                    package_file = self._probe_package_file(package_id, architecture)
 
-                if package_path.exists():
-                    package_size = package_path.stat().st_size / (1024 * 1024)  # MB
+                if package_file:
+                    package_path, package_bytes = package_file
+                    package_size = package_bytes / (1024 * 1024)  # MB
                     logger.info(f"  📁 找到包文件: {package_path} ({package_size:.1f} MB)")
+                    found_packages.append((package_id, package_path, is_language_package))
+                else:
+                    error_msg = f"找不到包文件: {package_id}"
+                    error_messages.append(error_msg)
+                    logger.warning(f"  ⚠️ {package_type}文件缺失: {package_id}")
 
-                    args = [
-                        "/image:" + str(mount_dir),
-                        "/add-package",
-                        "/packagepath:" + str(package_path)
-                    ]
+            dism_path = self.adk.get_dism_path()
+
+            # 一次DISM调用按顺序添加所有包，镜像只打开和提交一次；
+            # 只有DISM输出中确认成功的包才计为成功，其余包（失败或结果不明确）再逐个添加
+            pending_packages = found_packages
+            if len(found_packages) > 1:
+                args = ["/image:" + str(mount_dir), "/add-package"]
+                args.extend("/packagepath:" + str(package_path) for _, package_path, _ in found_packages)
+
+                logger.info(f"  🚀 批量添加 {len(found_packages)} 个包，执行DISM命令:")
+                logger.info(f"     {' '.join([str(dism_path)] + args)}")
+
+                batch_success, stdout, stderr = self.adk.run_dism_command(args)
+                confirmed = self._parse_batch_results(stdout, len(found_packages), batch_success)
+                pending_packages = []
+                for index, package in enumerate(found_packages, 1):
+                    if index not in confirmed:
+                        pending_packages.append(package)
+                        continue
+                    package_id, _, is_language_package = package
+                    success_count += 1
+                    if is_language_package:
+                        language_count += 1
+                        logger.info(f"  ✅ 语言包添加成功: {package_id} (语言支持已增强)")
+                    else:
+                        other_count += 1
+                        logger.info(f"  ✅ 功能组件添加成功: {package_id}")
 
-                    # 显示完整的DISM命令
-                    dism_path = self.adk.get_dism_path()
-                    full_command = [str(dism_path)] + args
-                    command_str = ' '.join(full_command)
-                    logger.info(f"  🚀 执行DISM命令:")
-                    logger.info(f"     {command_str}")
+                if pending_packages:
+                    logger.warning(f"  ⚠️ 批量添加中 {len(pending_packages)} 个包未确认成功，改为逐个添加: {stderr}")
 
-                    success, stdout, stderr = self.adk.run_dism_command(args)
+            for package_id, package_path, is_language_package in pending_packages:
+                package_type = "🌐语言包" if is_language_package else "⚙️ 功能组件"
+                args = [
+                    "/image:" + str(mount_dir),
+                    "/add-package",
+                    "/packagepath:" + str(package_path)
+                ]
+
+                # 显示完整的DISM命令
+                full_command = [str(dism_path)] + args
+                command_str = ' '.join(full_command)
+                logger.info(f"  🚀 执行DISM命令:")
+                logger.info(f"     {command_str}")
 
-                    if success:
-                        success_count += 1
-                        if is_language_package:
-                            language_count += 1
-                            logger.info(f"  ✅ 语言包添加成功: {package_id} (语言支持已增强)")
-                        else:
-                            other_count += 1
-                            logger.info(f"  ✅ 功能组件添加成功: {package_id}")
+                success, stdout, stderr = self.adk.run_dism_command(args)
+
+                if success:
+                    success_count += 1
+                    if is_language_package:
+                        language_count += 1
+                        logger.info(f"  ✅ 语言包添加成功: {package_id} (语言支持已增强)")
                     else:
-                        error_msg = f"添加包失败 {package_id}: {stderr}"
-                        error_messages.append(error_msg)
-                        logger.error(f"  ❌ {package_type}添加失败: {package_id}")
-                        logger.error(f"     错误详情: {stderr}")
+                        other_count += 1
+                        logger.info(f"  ✅ 功能组件添加成功: {package_id}")
                 else:
-                    error_msg = f"找不到包文件: {package_id}"
+                    error_msg = f"添加包失败 {package_id}: {stderr}"
                     error_messages.append(error_msg)
-                    logger.warning(f"  ⚠️ {package_type}文件缺失: {package_id}")
+                    logger.error(f"  ❌ {package_type}添加失败: {package_id}")
+                    logger.error(f"     错误详情: {stderr}")
 
             # 详细的统计信息
             logger.info(f"📊 组件添加完成统计:")
@@ -130,6 +175,79 @@ class PackageManager:
             logger.error(error_msg)
             return False, error_msg
 
+    @staticmethod
+    def _parse_batch_results(stdout: str, package_count: int, batch_success: bool) -> set:
+        """从批量添加包的DISM输出中找出确认添加成功的包
+
+        DISM按参数顺序逐个处理包，每个包以 "Processing i of N" 进度行开头；
+        某个包的输出段中没有错误标记才视为成功。整条命令失败时，最后处理的包
+        结果不明确，同样不计为成功
+
+        Args:
+            stdout: DISM标准输出
+            package_count: 批量添加的包数量
+            batch_success: DISM命令是否成功
+
+        Returns:
+            set: 确认成功的包序号（从1开始）
+        """
+        steps = [
+            (int(match.group(1)), match.start())
+            for match in _DISM_PACKAGE_STEP_RE.finditer(stdout or "")
+            if int(match.group(2)) == package_count
+        ]
+        confirmed = set()
+        failed = set()
+        for position, (index, start) in enumerate(steps):
+            is_last = position + 1 == len(steps)
+            end = len(stdout) if is_last else steps[position + 1][1]
+            if (is_last and not batch_success) or _DISM_ERROR_RE.search(stdout, start, end):
+                failed.add(index)
+            elif 1 <= index <= package_count:
+                confirmed.add(index)
+        return confirmed - failed
+
+    def _get_package_dirs(self, architecture: str) -> List[Path]:
+        """获取WinPE可选组件目录列表，ADK目录优先"""
+        package_dirs = []
+        if self.adk.adk_path:
+            package_dirs.append(self.adk.adk_path / "Assessment and Deployment Kit" /
+                                "Windows Preinstallation Environment" / architecture / "WinPE_OCs")
+        if self.adk.winpe_path:
+            package_dirs.append(self.adk.winpe_path / architecture / "WinPE_OCs")
+        return package_dirs
+
+    def _index_package_files(self, architecture: str) -> Dict[str, Tuple[Path, int]]:
+        """列出WinPE可选组件目录中的cab文件
+
+        Args:
+            architecture: WinPE架构
+
+        Returns:
+            Dict[str, Tuple[Path, int]]: 小写文件名 -> (包路径, 文件大小)，同名包以靠前目录为准
+        """
+        package_index = {}
+        for package_dir in self._get_package_dirs(architecture):
+            try:
+                with os.scandir(package_dir) as entries:
+                    for entry in entries:
+                        name = entry.name.lower()
+                        if name.endswith(".cab") and name not in package_index and entry.is_file():
+                            package_index[name] = (Path(entry.path), entry.stat().st_size)
+            except OSError:
+                continue
+        return package_index
+
+    def _probe_package_file(self, package_id: str, architecture: str) -> Optional[Tuple[Path, int]]:
+        """按目录顺序逐个探测包文件，返回 (包路径, 文件大小)，找不到时返回None"""
+        for package_dir in self._get_package_dirs(architecture):
+            package_path = package_dir / f"{package_id}.cab"
+            try:
+                return package_path, package_path.stat().st_size
+            except OSError:
+                continue
+        return None
+
     def add_drivers(self, current_build_path: Path, driver_paths: List[str]) -> Tuple[bool, str]:
         """添加驱动程序
 
@@ -233,9 +351,9 @@ class PackageManager:
                     if src_path.exists():
                         dst_path = mount_dir / src_path.name
                         if src_path.is_file():
-                            shutil.copy2(src_path, dst_path)
+                            fast_copy2(src_path, dst_path)
                         else:
-                            shutil.copytree(src_path, dst_path, dirs_exist_ok=True)
+                            shutil.copytree(src_path, dst_path, dirs_exist_ok=True, copy_function=fast_copy2)
                         success_count += 1
                         logger.info(f"成功复制文件: {src_path}")
                     else:
@@ -254,7 +372,7 @@ class PackageManager:
                     src_path = Path(script_info.get("path", ""))
                     if src_path.exists():
                         dst_path = scripts_dir / src_path.name
-                        shutil.copy2(src_path, dst_path)
+                        fast_copy2(src_path, dst_path)
                         success_count += 1
                         logger.info(f"成功复制脚本: {src_path}")
                     else:
@@ -17,6 +17,7 @@ from PyQt5.QtCore import Qt
 from ui.build.build_thread import BuildThread
 from ui.button_styler import apply_3d_button_style, apply_3d_button_style_alternate, apply_3d_button_style_red
 from ui.shared.wim_operations_common import WIMOperationsCommon
+from utils.file_utils import get_directory_usage
 from utils.logger import log_error
 
 
@@ -334,11 +335,7 @@ class BuildManagers:
     def _get_directory_size(self, directory: Path) -> int:
         """获取目录大小（字节）"""
         try:
-            total_size = 0
-            for file_path in directory.rglob("*"):
-                if file_path.is_file():
-                    total_size += file_path.stat().st_size
-            return total_size
+            return get_directory_usage(directory)[1]
         except Exception:
             return 0
 
@@ -474,7 +471,7 @@ class BuildManagers:
             try:
                 for build_path in all_builds:
                     if Path(build_path).exists():
-                        total_size += sum(f.stat().st_size for f in Path(build_path).rglob("*") if f.is_file())
+                        total_size += self._get_directory_size(Path(build_path))
             except:
                 pass
 
@@ -530,7 +527,7 @@ class BuildManagers:
                             # 计算要删除的目录大小
                             dir_size = 0
                             if Path(build_path).exists():
-                                dir_size = sum(f.stat().st_size for f in Path(build_path).rglob("*") if f.is_file())
+                                dir_size = self._get_directory_size(Path(build_path))
 
                             # 使用强制删除功能
                             from utils.file_utils import force_remove_tree
@@ -417,8 +417,8 @@ class Helpers:
 
             # 移除所有语言相关的包
             all_language_packages = set()
-            for lang_code in winpe_packages.get_language_support_mapping().keys():
-                all_language_packages.update(winpe_packages.get_language_packages(lang_code))
+            for language_info in winpe_packages.get_language_support_mapping().values():
+                all_language_packages.update(language_info["packages"])
 
             current_packages -= all_language_packages
 
@@ -269,6 +269,9 @@ class WIMOperationsCommon:
             from PyQt5.QtWidgets import QListWidgetItem
             from PyQt5.QtGui import QColor
 
+            # 同一构建目录下的多个WIM共用一次stat和时间格式化
+            build_time_cache = {}
+
             for wim_file in wim_files:
                 # 计算文件大小
                 size_mb = wim_file["size"] / (1024 * 1024)
@@ -279,9 +282,11 @@ class WIMOperationsCommon:
 
                 # 构建目录信息
                 build_dir_name = wim_file["build_dir"].name
-                import datetime
-                ctime = wim_file["build_dir"].stat().st_ctime
-                time_str = datetime.datetime.fromtimestamp(ctime).strftime('%Y-%m-%d %H:%M')
+                time_str = build_time_cache.get(wim_file["build_dir"])
+                if time_str is None:
+                    ctime = wim_file["build_dir"].stat().st_ctime
+                    time_str = time.strftime('%Y-%m-%d %H:%M', time.localtime(ctime))
+                    build_time_cache[wim_file["build_dir"]] = time_str
 
                 # WIM相对路径
                 wim_relative_path = str(wim_file["path"]).replace(str(wim_file["build_dir"]), "").lstrip("\\/")
@@ -4,12 +4,44 @@
 """
 
 import os
+import re
 import shutil
 import time
 import stat
-from typing import Optional, Callable
+import ctypes
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Union, Iterable, Iterator, Dict, Tuple
 from pathlib import Path
 
+# CopyFileExW标志：绕过系统缓存，适用于boot.wim等一次性复制的大文件
+COPY_FILE_NO_BUFFERING = 0x00001000
+
+# 判断文件未变化时允许的修改时间误差（纳秒），兼容FAT文件系统2秒的时间精度
+_MTIME_TOLERANCE_NS = 2 * 1_000_000_000
+
+# 并行复制目录树时的线程数，小文件复制主要耗在等待I/O上，线程数可以多于CPU核数
+_TREE_COPY_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 删除目录前检查：路径中出现任一名称即视为受保护（项目关键文件夹、Git和Python相关），
+# 合并为一个正则，一次扫描完成匹配，无需逐个模式转小写后查找子串
+_PROTECTED_NAME_RE = re.compile("|".join(map(re.escape, (
+    # 特殊项目目录
+    "core", "ui", "utils", "config", "scripts", "drivers", "templates", "logs", "ico",
+    # Git相关
+    ".git", ".gitignore", ".gitattributes",
+    # Python相关
+    "venv", ".venv", "env", ".env", "__pycache__", "*.pyc",
+))), re.IGNORECASE)
+
+# 删除目录前检查：路径任一部分（小写）是这些名称时拒绝删除
+_DANGEROUS_DIR_NAMES = frozenset({
+    "system32", "syswow64", "drivers", "etc", "boot",
+    "windows", "program files", "programdata", "users",
+    "documents and settings", "recycler", "$recycle.bin",
+    "system volume information"
+})
+
 
 def force_remove_file(file_path: str, max_retries: int = 3, delay: float = 1.0) -> bool:
     """
@@ -120,29 +152,31 @@ def _force_remove_tree_manual(directory_path: str, progress_callback: Optional[C
         directory_path: 要删除的目录路径
         progress_callback: 进度回调函数
     """
-    # 多次尝试，处理顽固文件和目录
     max_attempts = 3
 
-    for attempt in range(max_attempts):
+    def on_error(func, path, exc_info):
+        """删除失败时移除只读属性后重试一次，其余文件继续删除"""
         try:
-            # 先尝试使用shutil的完整删除
-            import shutil
-            shutil.rmtree(directory_path, ignore_errors=True)
+            os.chmod(path, stat.S_IWRITE)
+            func(path)
+        except OSError:
+            pass
 
-            # 验证目录是否真的被删除了
-            if not os.path.exists(directory_path):
-                if progress_callback:
-                    progress_callback(f"已成功删除目录: {directory_path}")
-                return True
+    # 先整体删除一遍，只读文件在同一遍中处理；连续重复删除不会改变结果，只需一遍
+    try:
+        shutil.rmtree(directory_path, onerror=on_error)
 
-            # 如果还存在，继续下面的手动删除逻辑
+        # 验证目录是否真的被删除了
+        if not os.path.exists(directory_path):
+            if progress_callback:
+                progress_callback(f"已成功删除目录: {directory_path}")
+            return True
 
-        except Exception as e:
-            if attempt == max_attempts - 1:
-                if progress_callback:
-                    progress_callback(f"shutil删除失败，尝试手动删除: {str(e)}")
-            else:
-                continue
+        # 如果还存在，继续下面的手动删除逻辑
+
+    except Exception as e:
+        if progress_callback:
+            progress_callback(f"shutil删除失败，尝试手动删除: {str(e)}")
 
     # 手动删除逻辑
     try:
@@ -163,7 +197,6 @@ def _force_remove_tree_manual(directory_path: str, progress_callback: Optional[C
                 dir_path = os.path.join(root, name)
                 try:
                     # 使用更强的目录删除方法
-                    import shutil
                     shutil.rmtree(dir_path, ignore_errors=True)
                     if not os.path.exists(dir_path):
                         if progress_callback:
@@ -181,11 +214,9 @@ def _force_remove_tree_manual(directory_path: str, progress_callback: Optional[C
         try:
             if os.path.exists(directory_path):
                 # 尝试删除剩余的空目录
-                import shutil
                 shutil.rmtree(directory_path, ignore_errors=True)
 
                 # 等待一下让文件系统同步
-                import time
                 time.sleep(0.5)
 
                 # 再次检查
@@ -236,24 +267,16 @@ def _is_safe_to_delete(directory_path: str) -> bool:
         Path.cwd(),
         # 项目目录关键文件夹
         Path(__file__).parent.parent,
-        # 特殊项目目录
-        "core", "ui", "utils", "config", "scripts", "drivers", "templates", "logs", "ico",
-        # Git相关
-        ".git", ".gitignore", ".gitattributes",
-        # Python相关
-        "venv", ".venv", "env", ".env", "__pycache__", "*.pyc",
     ]
 
     # 检查路径是否匹配受保护模式
-    path_str = str(path).lower()
     for pattern in protected_patterns:
-        if isinstance(pattern, Path):
-            if path == pattern or path.is_relative_to(pattern):
-                return False
-        else:
-            # 字符串模式匹配
-            if pattern.lower() in path_str:
-                return False
+        if path == pattern or path.is_relative_to(pattern):
+            return False
+
+    # 字符串模式匹配
+    if _PROTECTED_NAME_RE.search(str(path)):
+        return False
 
     # 定义受保护的目录类型
     workspace_names = ["WinPE_amd64", "WinPE_x86", "WinPE_arm64"]
@@ -285,20 +308,248 @@ def _is_safe_to_delete(directory_path: str) -> bool:
         return False
 
     # 检查是否是特殊目录类型
-    dangerous_names = [
-        "system32", "syswow64", "drivers", "etc", "boot",
-        "windows", "program files", "programdata", "users",
-        "documents and settings", "recycler", "$recycle.bin",
-        "system volume information"
-    ]
-
     for part in path.parts:
-        if part.lower() in dangerous_names:
+        if part.lower() in _DANGEROUS_DIR_NAMES:
             return False
 
     return True
 
 
+def fast_copy2(src: Union[str, Path], dst: Union[str, Path], flags: int = 0) -> Union[str, Path]:
+    """
+    复制文件及其元数据，与shutil.copy2用法一致
+
+    Windows下直接调用CopyFileExW，数据复制在内核中完成，不经过Python层的读写循环；
+    CopyFileExW本身会保留文件属性和修改时间，无需再调用copystat；
+    调用失败或非Windows平台时回退到shutil.copy2，由其抛出对应的异常
+
+    Args:
+        src: 源文件路径
+        dst: 目标文件或目录路径
+        flags: CopyFileExW复制标志，如COPY_FILE_NO_BUFFERING
+
+    Returns:
+        目标文件路径
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+
+    if os.name == 'nt':
+        try:
+            if ctypes.windll.kernel32.CopyFileExW(str(src), str(dst), None, None, None, flags):
+                return dst
+        except (AttributeError, OSError):
+            pass
+
+    return shutil.copy2(src, dst)
+
+
+def file_needs_copy(src: Union[str, Path], dst: Union[str, Path]) -> bool:
+    """
+    判断是否需要把源文件复制到目标位置
+
+    目标文件存在且大小相同、修改时间在误差范围内一致时视为已是最新（copy2会保留修改时间），
+    无法获取文件信息时保守地返回True
+
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+
+    Returns:
+        bool: 是否需要复制
+    """
+    try:
+        src_stat = os.stat(src)
+        dst_stat = os.stat(dst)
+    except OSError:
+        return True
+
+    return (src_stat.st_size != dst_stat.st_size or
+            abs(src_stat.st_mtime_ns - dst_stat.st_mtime_ns) >= _MTIME_TOLERANCE_NS)
+
+
+def robocopy_tree(src: Union[str, Path], dst: Union[str, Path],
+                  exclude_dirs: Iterable[str] = (), threads: int = 16) -> bool:
+    """
+    使用robocopy多线程复制整个目录树
+
+    Args:
+        src: 源目录路径
+        dst: 目标目录路径
+        exclude_dirs: 需要排除的目录名
+        threads: robocopy复制线程数
+
+    Returns:
+        bool: 是否复制成功；非Windows平台、robocopy不可用或有文件复制失败时返回False，
+              调用方应回退到Python实现的复制
+    """
+    if os.name != 'nt':
+        return False
+
+    cmd = ["robocopy", str(src), str(dst), "/E", f"/MT:{threads}", "/R:1", "/W:1",
+           "/XJ", "/NFL", "/NDL", "/NP", "/NJH", "/NJS"]
+    exclude_dirs = list(exclude_dirs)
+    if exclude_dirs:
+        cmd += ["/XD", *exclude_dirs]
+
+    try:
+        completed = subprocess.run(cmd, capture_output=True,
+                                   creationflags=subprocess.CREATE_NO_WINDOW)
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+    # robocopy返回码0-7均表示成功，8及以上表示存在复制失败的文件
+    return completed.returncode <= 7
+
+
+def copy_tree_parallel(src: Union[str, Path], dst: Union[str, Path],
+                       max_workers: int = _TREE_COPY_WORKERS) -> None:
+    """
+    多线程复制目录树，用法与shutil.copytree(src, dst, dirs_exist_ok=True)一致
+
+    遍历源目录时先创建全部目标目录，文件交给线程池用fast_copy2并行复制；
+    与copytree相同，全部复制完成后如有失败的文件，统一抛出shutil.Error
+
+    Args:
+        src: 源目录路径
+        dst: 目标目录路径
+        max_workers: 复制线程数
+    """
+    errors = []
+    file_pairs = []
+    pending = [(os.fspath(src), os.fspath(dst))]
+    while pending:
+        src_dir, dst_dir = pending.pop()
+        try:
+            os.makedirs(dst_dir, exist_ok=True)
+            with os.scandir(src_dir) as it:
+                for entry in it:
+                    target = os.path.join(dst_dir, entry.name)
+                    if entry.is_dir():
+                        pending.append((entry.path, target))
+                    else:
+                        file_pairs.append((entry.path, target))
+        except OSError as e:
+            errors.append((src_dir, dst_dir, str(e)))
+
+    def copy_one(pair):
+        try:
+            fast_copy2(*pair)
+        except OSError as e:
+            errors.append((pair[0], pair[1], str(e)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 逐个取回结果，OSError以外的异常由此抛给调用方，而不是在线程中被静默丢弃
+        for _ in executor.map(copy_one, file_pairs):
+            pass
+
+    if errors:
+        raise shutil.Error(errors)
+
+
+def walk_files(root: Union[str, Path]) -> Iterator[os.DirEntry]:
+    """
+    递归遍历目录下的所有文件条目
+
+    基于os.scandir的显式栈遍历，目录/文件类型直接取自目录项，不再逐个stat；
+    不进入目录符号链接，无法访问的目录直接跳过
+
+    Args:
+        root: 要遍历的根目录
+
+    Yields:
+        os.DirEntry: 文件条目
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except OSError:
+            continue
+
+
+def stat_size(file_path: Union[str, Path]) -> Optional[int]:
+    """获取文件大小，文件不存在或无法访问时返回None"""
+    try:
+        return os.stat(file_path).st_size
+    except OSError:
+        return None
+
+
+def get_directory_usage(root: Union[str, Path]) -> Tuple[int, int]:
+    """
+    遍历目录树一次，统计文件数和文件总大小
+
+    文件类型取自目录项，大小只对文件取一次，不再像rglob("*") + is_file()那样对每个条目单独stat；
+    与walk_files一致，不进入目录符号链接，避免链接成环时无限遍历或重复统计
+
+    Args:
+        root: 要统计的根目录，不存在或无法访问的目录按空目录处理
+
+    Returns:
+        Tuple[int, int]: (文件数, 总字节数)
+    """
+    file_count = 0
+    total_size = 0
+    pending = [os.fspath(root)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file():
+                            file_count += 1
+                            total_size += entry.stat().st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return file_count, total_size
+
+
+def index_files_by_name(root: Union[str, Path]) -> Dict[str, Path]:
+    """
+    遍历目录一次，按文件名建立索引
+
+    遍历顺序与rglob一致（先当前目录再逐个子目录），同名文件保留首次出现的路径；
+    键为os.path.normcase处理后的文件名，查找时同样需先normcase；不进入目录符号链接
+
+    Args:
+        root: 要建立索引的根目录，不存在时返回空索引
+
+    Returns:
+        Dict[str, Path]: 文件名到文件路径的映射
+    """
+    index = {}
+    pending = [os.fspath(root)]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    index.setdefault(os.path.normcase(entry.name), Path(entry.path))
+                elif entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+            except OSError:
+                continue
+        pending.extend(reversed(subdirs))
+    return index
+
+
 def is_file_locked(file_path: str) -> bool:
     """
     检查文件是否被锁定